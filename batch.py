@@ -0,0 +1,159 @@
+"""
+Headless batch analysis of recorded workout videos.
+
+Runs videos through the same trackers used by the live app and writes the
+per-rep (or per-hold) results. Files, and chunks of long files, are spread
+across a process pool so all cores are used.
+
+    python batch.py --exercise Push-up --out results.csv videos/*.mp4
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from export import write_rows
+from trackers import TRACKER_MAPPING, ManualClock
+
+
+def probe_video(path):
+    """Returns (fps, frame_count) for a video file."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frame_count
+
+
+def plan_chunks(path, chunk_seconds, warmup_seconds):
+    """Splits a video into (path, start, end, warmup) frame ranges."""
+    fps, frame_count = probe_video(path)
+    if chunk_seconds <= 0 or frame_count <= 0:
+        return [(path, 0, frame_count or None, 0)]
+
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    warmup_frames = int(warmup_seconds * fps)
+    n_chunks = math.ceil(frame_count / chunk_frames)
+    return [
+        (path, i * chunk_frames, min(frame_count, (i + 1) * chunk_frames), warmup_frames)
+        for i in range(n_chunks)
+    ]
+
+
+def analyze_chunk(exercise, path, start, end, warmup):
+    """
+    Runs one tracker over frames [start, end) of a video.
+    The tracker starts `warmup` frames early so a rep that began in the previous
+    chunk is still seen from its bottom; only results completed inside the chunk are kept.
+    """
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    first = max(0, start - warmup)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    clock = ManualClock(first / fps)
+    # Offline analysis has no frame deadline: every frame gets pose inference at full model complexity
+    tracker = TRACKER_MAPPING[exercise](session_start_time=start / fps, clock=clock,
+                                        latency_budget_ms=None, adaptive_complexity=False)
+    base_entries = 0
+    base_counter = 0.0
+
+    try:
+        index = first
+        while end is None or index < end:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if index == start:
+                # Everything before this point was warm-up
+                base_entries = len(tracker.session_data)
+                base_counter = tracker.counter
+            clock.now = index / fps
+            tracker.process_frame(frame, annotate=False)
+            index += 1
+    finally:
+        cap.release()
+        tracker.close()
+
+    for entry in tracker.session_data[base_entries:]:
+        entry["file"] = os.path.basename(path)
+    return {
+        "path": path,
+        "start": start,
+        "entries": tracker.session_data[base_entries:],
+        "base_counter": base_counter,
+        "counter": tracker.counter - base_counter,
+    }
+
+
+def merge_chunks(exercise, chunks):
+    """Combines chunk results of one file into a single ordered result."""
+    chunks = sorted(chunks, key=lambda c: c["start"])
+    entries = []
+    total = 0.0
+    for chunk in chunks:
+        for entry in chunk["entries"]:
+            if "rep" in entry:
+                entry["rep"] = len(entries) + 1
+            elif "time_held" in entry:
+                # Plank entries hold the running total, re-base it onto the whole file
+                entry["time_held"] = total + entry["time_held"] - chunk["base_counter"]
+            entries.append(entry)
+        total += chunk["counter"]
+    return {"exercise": exercise, "final_count": total, "rep_data": entries}
+
+
+def run_batch(exercise, paths, workers=None, chunk_seconds=0.0, warmup_seconds=10.0):
+    """Analyses all videos in a process pool. Returns {path: result}."""
+    jobs = []
+    for path in paths:
+        jobs.extend(plan_chunks(path, chunk_seconds, warmup_seconds))
+
+    per_file = {path: [] for path in paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(analyze_chunk, exercise, *job) for job in jobs]
+        for future in futures:
+            chunk = future.result()
+            per_file[chunk["path"]].append(chunk)
+
+    return {path: merge_chunks(exercise, chunks) for path, chunks in per_file.items()}
+
+
+def write_results(results, out_path):
+    """
+    Writes results as JSON (per file, with its final count), or as flat per-rep rows with
+    the file first when the path ends in .csv or .parquet.
+    """
+    if out_path.lower().endswith((".csv", ".parquet")):
+        write_rows([entry for result in results.values() for entry in result["rep_data"]], out_path, first=("file",))
+    else:
+        with open(out_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score recorded workout videos without Streamlit.")
+    parser.add_argument("videos", nargs="+", help="Video files to analyse.")
+    parser.add_argument("--exercise", choices=list(TRACKER_MAPPING.keys()), required=True)
+    parser.add_argument("--out", default="results.json", help="Output file (.json, .csv or .parquet).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--chunk-seconds", type=float, default=0.0,
+                        help="Split long videos into chunks of this length (0 = whole files).")
+    parser.add_argument("--warmup-seconds", type=float, default=10.0,
+                        help="Extra footage analysed before each chunk so reps crossing a boundary are counted.")
+    args = parser.parse_args(argv)
+
+    results = run_batch(args.exercise, args.videos, args.workers, args.chunk_seconds, args.warmup_seconds)
+    write_results(results, args.out)
+    for path, result in results.items():
+        print(f"{path}: {result['final_count']:.1f} ({args.exercise})")
+
+
+if __name__ == "__main__":
+    main()
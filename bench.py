@@ -0,0 +1,255 @@
+"""
+Camera-free benchmarks for the frame pipeline and the rep state machines.
+
+    python bench.py --out bench_results.json
+    python bench.py --quick --compare bench_results.json
+
+Synthetic landmark sequences drive the tracker state machines (through score(), so
+no MediaPipe), and synthetic frames of a drawn figure drive transform() end to end.
+Each benchmark reports frames per second, per-frame latency percentiles and the
+Python/NumPy memory allocated per frame (traced in a separate, untimed pass).
+Results are written as JSON so runs on different commits can be compared.
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from landmarks import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST,
+    RIGHT_ANKLE, RIGHT_ELBOW, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST,
+    joint_angles, new_landmark_array,
+)
+
+FPS = 30.0
+
+
+# --- Synthetic Inputs ---
+def _rotate(length, degrees):
+    """Vector of `length` pointing `degrees` away from straight down (image coordinates)."""
+    radians = math.radians(degrees)
+    return length * math.sin(radians), length * math.cos(radians)
+
+
+def synthetic_landmarks(exercise, frames, rep_frames=45, seed=0):
+    """Returns a (frames, 33, 4) landmark sequence of side-view reps (or a plank hold with breaks)."""
+    rng = np.random.default_rng(seed)
+    sequence = np.empty((frames, 33, 4), dtype=np.float32)
+    for i in range(frames):
+        phase = 0.5 - 0.5 * math.cos(2 * math.pi * i / rep_frames) # 0 = top, 1 = bottom
+        points = new_landmark_array()
+        points[:, 0:2] = 0.5
+        points[:, 3] = 0.95
+
+        if exercise == "Push-up":
+            elbow = 175.0 - 125.0 * phase
+            shoulder, hip, ankle = (0.35, 0.45 + 0.1 * phase), (0.55, 0.5 + 0.08 * phase), (0.8, 0.6)
+            ex, ey = shoulder[0], shoulder[1] + 0.1
+            # Wrist direction: rotate the upper arm (pointing down) by the elbow angle
+            dx, dy = _rotate(0.1, 180.0 - elbow)
+            joints = {LEFT_SHOULDER: shoulder, LEFT_ELBOW: (ex, ey), LEFT_WRIST: (ex + dx, ey + dy),
+                      LEFT_HIP: hip, LEFT_KNEE: ((hip[0] + ankle[0]) / 2, (hip[1] + ankle[1]) / 2), LEFT_ANKLE: ankle}
+        elif exercise in ("Squat", "Lunge"):
+            knee_angle = 175.0 - 95.0 * phase
+            knee, ankle = (0.5, 0.7), (0.5, 0.9)
+            dx, dy = _rotate(0.2, knee_angle)
+            hip = (knee[0] + dx, knee[1] + dy)
+            joints = {LEFT_KNEE: knee, LEFT_ANKLE: ankle, LEFT_HIP: hip, LEFT_SHOULDER: (hip[0], hip[1] - 0.25),
+                      LEFT_ELBOW: (hip[0], hip[1] - 0.15), LEFT_WRIST: (hip[0], hip[1] - 0.05)}
+        else:
+            # Plank: straight line, hips sag for a few frames every 10 seconds
+            sag = 0.1 if (i % int(10 * FPS)) < 10 else 0.0
+            joints = {LEFT_SHOULDER: (0.3, 0.5), LEFT_HIP: (0.55, 0.5 + sag), LEFT_ANKLE: (0.8, 0.5),
+                      LEFT_KNEE: (0.68, 0.5), LEFT_ELBOW: (0.3, 0.6), LEFT_WRIST: (0.35, 0.6)}
+
+        mirror = {LEFT_SHOULDER: RIGHT_SHOULDER, LEFT_ELBOW: RIGHT_ELBOW, LEFT_WRIST: RIGHT_WRIST,
+                  LEFT_HIP: RIGHT_HIP, LEFT_KNEE: RIGHT_KNEE, LEFT_ANKLE: RIGHT_ANKLE}
+        for index, (x, y) in joints.items():
+            points[index, 0:2] = (x, y)
+            points[mirror[index], 0:2] = (x + 0.01, y)
+        points[:, 0:3] += rng.normal(0.0, 0.002, (33, 3)).astype(np.float32)
+        sequence[i] = points
+    return sequence
+
+
+def synthetic_frame(width, height, elbow_angle):
+    """Draws a simple cartoon figure (detected by MediaPipe) with the arms bent at `elbow_angle`."""
+    import cv2
+
+    frame = np.full((height, width, 3), (200, 220, 230), dtype=np.uint8)
+    s = height / 720.0
+    def p(x, y):
+        return int(width / 2 + (x - 240) * s), int(y * s)
+
+    skin, shirt, pants = (140, 170, 220), (60, 60, 160), (90, 60, 40)
+    cv2.circle(frame, p(240, 110), int(45 * s), skin, -1)
+    cv2.ellipse(frame, p(240, 90), (int(45 * s), int(30 * s)), 0, 180, 360, (30, 30, 30), -1)
+    cv2.rectangle(frame, p(180, 165), p(300, 380), shirt, -1)
+    for side in (-1, 1):
+        shoulder, elbow = (240 + side * 50, 180), (240 + side * 110, 300)
+        dx, dy = _rotate(100, 180.0 - elbow_angle)
+        wrist = (elbow[0] + side * dx, elbow[1] + dy)
+        cv2.line(frame, p(*shoulder), p(*elbow), shirt, int(35 * s))
+        cv2.line(frame, p(*elbow), p(*wrist), skin, int(28 * s))
+        cv2.line(frame, p(240 + side * 30, 380), p(240 + side * 40, 540), pants, int(45 * s))
+        cv2.line(frame, p(240 + side * 40, 540), p(240 + side * 45, 680), pants, int(40 * s))
+    return frame
+
+
+# --- Measurement ---
+def _traced_peaks(step, inputs):
+    """Peak traced memory above the starting point, per call of `step`."""
+    peaks = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        step(item)
+        peaks[i] = tracemalloc.get_traced_memory()[1] - base
+    return peaks
+
+
+def measure(step, inputs, warmup=10):
+    """Runs `step` once per input. Returns per-frame latencies and traced allocations."""
+    for item in inputs[:warmup]:
+        step(item)
+
+    latencies = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        step(item)
+        latencies[i] = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows everything down, so it never overlaps the timing
+    traced = inputs[:min(len(inputs), 200)]
+    tracemalloc.start()
+    floor = np.median(_traced_peaks(lambda item: None, traced)) # The bookkeeping's own allocations
+    blocks_before = sys.getallocatedblocks()
+    peaks = _traced_peaks(step, traced)
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    total = latencies.sum()
+    p50, p95, p99 = np.percentile(latencies * 1000.0, (50, 95, 99))
+    return {
+        "frames": len(inputs),
+        "fps": len(inputs) / total if total else float("inf"),
+        "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+        "alloc_bytes_per_frame": float(max(np.median(peaks) - floor, 0.0)),
+        "net_blocks_per_frame": (blocks_after - blocks_before) / len(traced),
+    }
+
+
+def bench_state_machines(frames):
+    from trackers import TRACKER_MAPPING, ManualClock
+
+    results = {}
+    for exercise, tracker_class in TRACKER_MAPPING.items():
+        sequence = synthetic_landmarks(exercise, frames)
+        clock = ManualClock()
+        tracker = tracker_class(session_start_time=0.0, clock=clock, pose_estimation=False)
+        counter = iter(range(10 ** 9))
+
+        def step(landmarks):
+            clock.now = next(counter) / FPS
+            tracker.score(landmarks)
+
+        results[f"state_machine/{exercise}"] = measure(step, list(sequence))
+        results[f"state_machine/{exercise}"]["final_count"] = float(tracker.counter)
+        tracker.close()
+    return results
+
+
+def bench_joint_angles(frames):
+    sequence = list(synthetic_landmarks("Push-up", frames))
+    out = np.zeros(8, dtype=np.float32)
+    return {"landmarks/joint_angles": measure(lambda landmarks: joint_angles(landmarks, out), sequence)}
+
+
+def bench_pipeline(frames, width, height, options):
+    import av
+    from trackers import TRACKER_MAPPING
+
+    images = [synthetic_frame(width, height, 175.0 - 125.0 * (0.5 - 0.5 * math.cos(2 * math.pi * i / 30)))
+              for i in range(30)]
+    video_frames = [av.VideoFrame.from_ndarray(images[i % len(images)], format="bgr24") for i in range(frames)]
+
+    results = {}
+    for exercise, tracker_class in TRACKER_MAPPING.items():
+        tracker = tracker_class(**options)
+        results[f"pipeline/{exercise}/{width}x{height}"] = measure(tracker.transform, video_frames)
+        tracker.close()
+    return results
+
+
+def environment():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": version("numpy"), "opencv": version("cv2"), "mediapipe": version("mediapipe"),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(current, baseline):
+    """Prints fps and p95 changes against a previous results file."""
+    print(f"\n{'benchmark':<40} {'fps':>12} {'p95 ms':>12}")
+    for name, stats in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        fps_change = (stats["fps"] / old["fps"] - 1.0) * 100 if old["fps"] else 0.0
+        p95_change = (stats["p95_ms"] / old["p95_ms"] - 1.0) * 100 if old["p95_ms"] else 0.0
+        print(f"{name:<40} {fps_change:>+11.1f}% {p95_change:>+11.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frame pipeline and rep state machines.")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--compare", help="Previous results file to compare against.")
+    parser.add_argument("--quick", action="store_true", help="Fewer frames, for a fast check.")
+    parser.add_argument("--skip-pipeline", action="store_true", help="Only run the MediaPipe-free benchmarks.")
+    parser.add_argument("--size", default="640x480", help="Synthetic frame size for the pipeline benchmark.")
+    args = parser.parse_args(argv)
+
+    frames = 300 if args.quick else 3000
+    results = {}
+    results.update(bench_joint_angles(frames))
+    results.update(bench_state_machines(frames))
+    if not args.skip_pipeline:
+        width, height = (int(v) for v in args.size.split("x"))
+        # Fixed pipeline settings so runs are comparable: no frame skipping, no model switching
+        options = {"latency_budget_ms": None, "adaptive_complexity": False, "async_inference": False}
+        results.update(bench_pipeline(30 if args.quick else 300, width, height, options))
+
+    report = {"environment": environment(), "results": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'benchmark':<40} {'fps':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'alloc B/frame':>14}")
+    for name, stats in results.items():
+        print(f"{name:<40} {stats['fps']:>10.1f} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} "
+              f"{stats['p99_ms']:>9.3f} {stats['alloc_bytes_per_frame']:>14.0f}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
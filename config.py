@@ -0,0 +1,56 @@
+"""
+Exercise and pipeline settings shared by the Streamlit page and the trackers.
+
+Kept free of cv2, mediapipe and streamlit_webrtc imports: the page reads these on every
+rerun and only imports the tracker stack (trackers.py) when a stream starts.
+"""
+from rules import RULES
+
+# --- Standard Angle Configuration ---
+# Thresholds of every exercise rule (see rules.RULES for the full definitions)
+CONFIG = {name: {"down": rule["down"], "up": rule["up"], "desc": rule["desc"]} for name, rule in RULES.items()}
+
+# --- Frame Pipeline Configuration ---
+# Defaults for every tracker; individual trackers can override them via keyword arguments.
+PIPELINE = {
+    "latency_budget_ms": 66.0, # Pose inference budget per frame, None runs pose on every frame
+    "max_frame_stride": 4, # Run pose at least every Nth frame when over budget
+    "inference_short_side": 480, # Downscale frames to this short side before inference, None keeps full resolution
+    "inference_scale": None, # Alternative fixed scale factor for inference, e.g. 0.5
+    "roi_crop": False, # Run inference on a box around the last detected body instead of the full frame
+    "roi_padding": 0.25, # ROI padding, relative to the body's bounding box
+    "roi_min_size": 0.2, # Smallest ROI, relative to the frame size
+    "motion_gate": False, # Reuse the last landmarks while the picture is static
+    "motion_threshold": 2.5, # Mean grayscale difference (0-255) that counts as movement
+    "motion_refresh_frames": 30, # Force an inference at least this often while static
+    "async_inference": False, # Analyse frames on a worker thread; the video only composites its latest result
+    "pose_workers": 0, # Run pose in a shared pool of this many worker processes, 0 keeps it in-process
+    "adaptive_complexity": True, # Step model_complexity down under load and back up with headroom
+    "max_model_complexity": 1, # Highest complexity the governor may pick (2 downloads the heavy model)
+    "target_fps": 15.0, # Inference slower than 1/target_fps counts as overloaded (the camera frame rate is not used)
+    "trace_dir": None, # Record every session's landmarks to a trace file in this directory
+    "pose_estimation": True, # False builds a tracker that is only fed landmarks (trace replay)
+    "metrics_port": 9108, # Local port serving per-stage timings (/metrics, /metrics.json), None disables it
+    "landmarks_only": False, # Receive video only and publish landmarks + state; the browser draws the overlay
+    "state_port": 9109, # Port serving the published state to the browser overlay in landmarks-only mode
+    "state_host": "127.0.0.1", # Interface for the state endpoint; "0.0.0.0" lets other devices on the network use the overlay
+    "export_dir": None, # Save each session's output video and rep_data to this directory
+    "export_format": "csv", # rep_data export format: csv, json or parquet
+    "export_fps": 30.0, # Frame rate written to the exported video
+    "export_queue_frames": 64, # Frames buffered for the video encoder; further frames are dropped and counted
+    "telemetry_frames": 65536, # Per-frame telemetry ring size (~36 min at 30 fps, 1 MB); older frames are overwritten
+}
+
+# --- Exercise Selection ---
+AUTO_EXERCISE = "Auto" # Detects the exercise (see trackers.AutoTracker)
+EXERCISES = list(RULES) + [AUTO_EXERCISE]
+
+# --- Helper Functions ---
+def format_time(seconds):
+    """Formats seconds into H:MM:SS."""
+    if seconds < 0:
+        seconds = 0
+    h = int(seconds // 3600)
+    m = int((seconds % 3600) // 60)
+    s = int(seconds % 60)
+    return f"{h:02}:{m:02}:{s:02}"
@@ -0,0 +1,120 @@
+"""
+Session export: the annotated video and the per-rep results.
+
+With PIPELINE["export_dir"] set, every session writes <exercise>_<start>_<id>.mp4 with the
+frames the tracker sends back, plus its rep_data as CSV, JSON or Parquet. Encoding runs on
+a background thread fed by a bounded queue. When the encoder falls behind, new frames
+are dropped and counted instead of stalling the video thread, so the recording can
+have gaps but the live stream never waits on the disk.
+"""
+import csv
+import io
+import json
+import os
+import queue
+import threading
+
+FORMATS = ("csv", "json", "parquet")
+
+
+class VideoExporter:
+    """Encodes submitted BGR frames to a video file on its own thread."""
+    def __init__(self, path, fps=30.0, max_queued_frames=64, fourcc="mp4v"):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queued_frames)
+        self._accepting = True
+        self._closed = False
+        # Not a daemon: a session that ends during shutdown still finalizes its file
+        self._thread = threading.Thread(target=self._run, name="video-export")
+        self._thread.start()
+
+    def submit(self, frame):
+        """Queues a frame without blocking. The caller must not modify the frame afterwards."""
+        if not self._accepting:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        # Imported here so the page can offer result downloads without loading OpenCV
+        import cv2
+
+        writer = None
+        size = None
+        failed = False
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is None:
+                    break
+                if failed:
+                    continue # Drain until close()
+                if writer is None:
+                    # The file is opened with the first frame's size
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, size)
+                    if not writer.isOpened():
+                        print(f"Warning: Could not open {self.path} for writing; the video is not exported.")
+                        self._accepting = False
+                        failed = True
+                        continue
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                writer.write(frame)
+                self.written += 1
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def close(self, timeout=None):
+        """
+        Stops accepting frames; the thread finishes encoding what is queued, then closes the file.
+        Waits up to `timeout` seconds (None waits until done, 0 returns at once). Returns True once finished.
+        """
+        if not self._closed:
+            self._closed = True
+            self._accepting = False
+            # Blocks only until the encoder has room for the end marker
+            self._queue.put(None)
+        if timeout != 0:
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+
+# --- Results Export ---
+def encode_rows(rows, fmt, first=()):
+    """Encodes rep_data rows (dicts) as CSV, JSON or Parquet bytes. Columns are sorted, after those in `first`."""
+    rows = list(rows)
+    fields = list(first) + sorted({key for row in rows for key in row} - set(first))
+    if fmt == "csv":
+        text = io.StringIO(newline="")
+        writer = csv.DictWriter(text, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+        return text.getvalue().encode()
+    if fmt == "json":
+        return json.dumps(rows, indent=2).encode()
+    if fmt == "parquet":
+        # pyarrow comes with Streamlit; imported here so the other formats don't pay for it
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({field: [row.get(field) for row in rows] for field in fields})
+        buffer = io.BytesIO()
+        pq.write_table(table, buffer)
+        return buffer.getvalue()
+    raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+
+
+def write_rows(rows, path, first=()):
+    """Writes rep_data rows to a file; the format comes from its extension (.csv, .json or .parquet)."""
+    fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    data = encode_rows(rows, fmt, first)
+    with open(path, "wb") as f:
+        f.write(data)
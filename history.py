@@ -0,0 +1,197 @@
+"""
+Workout history in a local SQLite database.
+
+Each finished session is written in one transaction: a row in `sessions`, its reps (or
+broken holds) in bulk into `reps`, and an upsert into the `daily` and `weekly` rollup
+tables keyed by (user, exercise, period). Progress charts read the rollups, which hold
+one row per user, exercise and day or week, so months of history load without scanning
+rep rows.
+
+    python history.py --user alice --exercise Push-up --period week
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+from rules import RULES
+
+DEFAULT_PATH = "workout_history.sqlite3"
+PERIODS = ("day", "week")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    reps INTEGER NOT NULL,
+    ok_reps INTEGER NOT NULL,
+    hold_seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_user_exercise_started ON sessions (user, exercise, started_at);
+
+CREATE TABLE IF NOT EXISTS reps (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    rep INTEGER,
+    form_ok INTEGER NOT NULL,
+    min_angle REAL,
+    duration REAL,
+    time_held REAL
+);
+CREATE INDEX IF NOT EXISTS reps_session ON reps (session_id);
+"""
+
+# One table per rollup period; the period key is the local date of the day or of the week's Monday
+_ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {period}ly (
+    user TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    {period} TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    ok_reps INTEGER NOT NULL,
+    hold_seconds REAL NOT NULL,
+    active_seconds REAL NOT NULL,
+    PRIMARY KEY (user, exercise, {period})
+) WITHOUT ROWID;
+"""
+
+_ROLLUP_UPSERT = """
+INSERT INTO {period}ly (user, exercise, {period}, sessions, reps, ok_reps, hold_seconds, active_seconds)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (user, exercise, {period}) DO UPDATE SET
+    sessions = sessions + 1,
+    reps = reps + excluded.reps,
+    ok_reps = ok_reps + excluded.ok_reps,
+    hold_seconds = hold_seconds + excluded.hold_seconds,
+    active_seconds = active_seconds + excluded.active_seconds
+"""
+
+
+def period_keys(timestamp):
+    """Local day and week (date of its Monday) of a Unix timestamp, as ISO dates."""
+    day = datetime.date.fromtimestamp(timestamp)
+    monday = day - datetime.timedelta(days=day.weekday())
+    return day.isoformat(), monday.isoformat()
+
+
+class HistoryStore:
+    """Workout history database. Every call opens its own connection, so any thread may use it."""
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            # WAL lets the progress view read while a session is being written
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA + "".join(_ROLLUP_SCHEMA.format(period=period) for period in PERIODS))
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def record_session(self, user, exercise, started_at, duration, final_count, rep_data):
+        """
+        Stores a finished session and updates its rollups. Returns the session id, or None
+        for exercises without a rule (e.g. an Auto session that never locked on).
+        """
+        rule = RULES.get(exercise)
+        if rule is None:
+            return None
+        if rule["mode"] == "reps":
+            reps = int(final_count)
+            ok_reps = sum(1 for data in rep_data if data.get('form_ok') and data.get('rep') is not None)
+            hold_seconds = 0.0
+        else:
+            reps, ok_reps, hold_seconds = 0, 0, float(final_count)
+        day, week = period_keys(started_at)
+
+        with closing(self._connect()) as connection, connection:
+            cursor = connection.execute(
+                "INSERT INTO sessions (user, exercise, started_at, duration, reps, ok_reps, hold_seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user, exercise, started_at, duration, reps, ok_reps, hold_seconds),
+            )
+            session_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO reps (session_id, rep, form_ok, min_angle, duration, time_held) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (session_id, data.get('rep'), bool(data.get('form_ok')), data.get('min_angle'),
+                     data.get('duration'), data.get('time_held'))
+                    for data in rep_data
+                ],
+            )
+            for period, key in zip(PERIODS, (day, week)):
+                connection.execute(_ROLLUP_UPSERT.format(period=period),
+                                   (user, exercise, key, reps, ok_reps, hold_seconds, duration))
+        return session_id
+
+    def progress(self, user, exercise, period="day", since=None):
+        """Rollup rows (dicts) for a user and exercise, oldest first. `since` is an ISO date."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}, expected one of {PERIODS}")
+        query = f"SELECT * FROM {period}ly WHERE user = ? AND exercise = ?"
+        params = [user, exercise]
+        if since is not None:
+            query += f" AND {period} >= ?"
+            params.append(since)
+        with closing(self._connect()) as connection:
+            return [dict(row) for row in connection.execute(query + f" ORDER BY {period}", params)]
+
+    def exercises(self, user):
+        """Exercises a user has history for."""
+        with closing(self._connect()) as connection:
+            rows = connection.execute("SELECT DISTINCT exercise FROM weekly WHERE user = ? ORDER BY exercise", (user,))
+            return [row["exercise"] for row in rows]
+
+    def recent_sessions(self, user, exercise=None, limit=20):
+        """Latest sessions of a user (dicts), newest first."""
+        query = "SELECT * FROM sessions WHERE user = ?"
+        params = [user]
+        if exercise is not None:
+            query += " AND exercise = ?"
+            params.append(exercise)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query + " ORDER BY started_at DESC LIMIT ?", params + [limit])
+            return [dict(row) for row in rows]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_history_store(path=DEFAULT_PATH):
+    """Returns the process-wide history store."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = HistoryStore(path)
+        return _default_store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show workout progress from the history database.")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    parser.add_argument("--user", default="default")
+    parser.add_argument("--exercise", help="Exercise name; lists the user's exercises when omitted")
+    parser.add_argument("--period", choices=PERIODS, default="week")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    if args.exercise is None:
+        for exercise in store.exercises(args.user):
+            print(exercise)
+        return
+    for row in store.progress(args.user, args.exercise, args.period):
+        print(f"{row[args.period]}  sessions={row['sessions']}  reps={row['reps']}  ok_reps={row['ok_reps']}"
+              f"  hold={row['hold_seconds']:.1f}s  active={row['active_seconds']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+
+# --- Landmark Layout ---
+# Row indices of the MediaPipe Pose landmarks (same values as mp.solutions.pose.PoseLandmark),
+# kept as plain ints so the hot path never touches the enum.
+NUM_LANDMARKS = 33
+X, Y, Z, VIS = 0, 1, 2, 3
+
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# Names for the landmarks above, as used by exercise rule definitions
+LANDMARK_INDEX = {
+    "left_shoulder": LEFT_SHOULDER, "right_shoulder": RIGHT_SHOULDER,
+    "left_elbow": LEFT_ELBOW, "right_elbow": RIGHT_ELBOW,
+    "left_wrist": LEFT_WRIST, "right_wrist": RIGHT_WRIST,
+    "left_hip": LEFT_HIP, "right_hip": RIGHT_HIP,
+    "left_knee": LEFT_KNEE, "right_knee": RIGHT_KNEE,
+    "left_ankle": LEFT_ANKLE, "right_ankle": RIGHT_ANKLE,
+}
+
+# --- Joint Angle Definitions ---
+# Each joint is (A, B, C) with B as the vertex of the angle joint_angles() computes.
+JOINTS = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    "right_shoulder": (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+JOINT_INDEX = {name: i for i, name in enumerate(JOINTS)}
+
+_A, _B, _C = (np.array(idx, dtype=np.intp) for idx in zip(*JOINTS.values()))
+
+
+def new_landmark_array():
+    """Allocates an empty (33, 4) float32 landmark array."""
+    return np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+
+
+def landmarks_to_array(pose_landmarks, out=None):
+    """
+    Converts MediaPipe pose landmarks into a (33, 4) float32 array of x, y, z, visibility.
+    Pass `out` to reuse a buffer across frames.
+    """
+    if out is None:
+        out = new_landmark_array()
+    out.ravel()[:] = [v for l in pose_landmarks.landmark for v in (l.x, l.y, l.z, l.visibility)]
+    return out
+
+
+def joint_angles(landmarks, out=None):
+    """
+    Calculates every angle in JOINTS (degrees, image plane) in one vectorized call.
+    Index the result with JOINT_INDEX.
+    """
+    x = landmarks[:, X]
+    y = landmarks[:, Y]
+    bx = x[_B]
+    by = y[_B]
+    bax = x[_A] - bx
+    bay = y[_A] - by
+    bcx = x[_C] - bx
+    bcy = y[_C] - by
+
+    # atan2(|cross|, dot) equals arccos of the normalized dot product without the norms or clipping
+    angle = np.arctan2(np.abs(bax * bcy - bay * bcx), bax * bcx + bay * bcy)
+    return np.degrees(angle, out=out)
+
+
+def landmark_roi(landmarks, width, height, padding=0.25, min_size=0.2):
+    """
+    Returns a padded pixel bounding box (x0, y0, x1, y1) around the landmarks.
+    `padding` is relative to the box size, `min_size` is relative to the frame size.
+    """
+    x = np.clip(landmarks[:, X], 0.0, 1.0)
+    y = np.clip(landmarks[:, Y], 0.0, 1.0)
+    x0, x1 = float(x.min()), float(x.max())
+    y0, y1 = float(y.min()), float(y.max())
+
+    half_w = max((x1 - x0) * (1.0 + 2 * padding), min_size) / 2
+    half_h = max((y1 - y0) * (1.0 + 2 * padding), min_size) / 2
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    return (
+        max(0, int((cx - half_w) * width)), max(0, int((cy - half_h) * height)),
+        min(width, int(np.ceil((cx + half_w) * width))), min(height, int(np.ceil((cy + half_h) * height))),
+    )
+
+
+def uncrop_landmarks(landmarks, roi, width, height):
+    """Maps landmarks detected inside a crop back to normalized full-frame coordinates, in place."""
+    x0, y0, x1, y1 = roi
+    crop_w = (x1 - x0) / width
+    crop_h = (y1 - y0) / height
+    landmarks[:, X] = landmarks[:, X] * crop_w + x0 / width
+    landmarks[:, Y] = landmarks[:, Y] * crop_h + y0 / height
+    # MediaPipe scales z like x
+    landmarks[:, Z] *= crop_w
+    return landmarks
@@ -0,0 +1,196 @@
+"""
+Landmarks-only sessions: the browser draws the overlay.
+
+With PIPELINE["landmarks_only"] the stream is SENDONLY. The server receives the
+camera video but sends no video back, so nothing is drawn or re-encoded per frame.
+Each tracker publishes a compact state message after every frame: counter, form,
+message, angle and the 33 landmarks quantized to integers. An HTML component in the
+page shows the local camera preview, polls the message from a small HTTP endpoint
+and draws the skeleton and HUD on a canvas over the preview.
+
+    curl http://127.0.0.1:9109/state/<session key>
+
+streamlit-webrtc does not expose WebRTC data channels to Python, so the messages
+use this endpoint instead. It binds to localhost by default (PIPELINE["state_host"])
+and only lets pages from the app's own origin read the state. Pages served over
+HTTPS need the endpoint behind the same TLS proxy, or the browser blocks the
+requests as mixed content.
+"""
+import json
+import threading
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from local_http import Endpoint, QuietHandler
+
+COORD_SCALE = 10000 # Normalized coordinates are sent as integers in 0..10000
+VIS_SCALE = 100
+
+_messages = {} # session key -> latest encoded message
+_messages_lock = threading.Lock()
+
+
+def encode_landmarks(landmarks):
+    """Flattens a (33, 4) landmark array to [x, y, visibility, ...] integers."""
+    packed = np.empty((landmarks.shape[0], 3), dtype=np.int32)
+    np.rint(landmarks[:, 0:2] * COORD_SCALE, out=packed[:, 0:2], casting="unsafe")
+    np.rint(landmarks[:, 3] * VIS_SCALE, out=packed[:, 2], casting="unsafe")
+    return packed.ravel().tolist()
+
+
+def publish(key, message):
+    """Stores a session's latest state message (a JSON-serializable dict)."""
+    body = json.dumps(message, separators=(",", ":")).encode()
+    with _messages_lock:
+        _messages[key] = body
+
+
+def discard(key):
+    with _messages_lock:
+        _messages.pop(key, None)
+
+
+def latest(key):
+    """Returns the latest encoded message for a session, or None."""
+    with _messages_lock:
+        return _messages.get(key)
+
+
+_app_port = 8501
+
+
+def is_app_origin(origin, host):
+    """True if `origin` is the Streamlit app's: the host this endpoint was reached on, at the app's port."""
+    try:
+        parsed = urlsplit(origin)
+        port = parsed.port or {"http": 80, "https": 443}.get(parsed.scheme)
+        return parsed.hostname is not None and parsed.hostname == urlsplit("//" + host).hostname and port == _app_port
+    except ValueError:
+        return False
+
+
+class _StateHandler(QuietHandler):
+    def do_GET(self):
+        # The overlay component runs in the Streamlit page's origin, not this port's. Other
+        # pages must not read the pose stream; clients without an Origin (curl) are not browsers.
+        origin = self.headers.get("Origin")
+        if origin is not None and not is_app_origin(origin, self.headers.get("Host", "")):
+            self.send_error(403)
+            return
+        prefix = "/state/"
+        body = latest(self.path[len(prefix):]) if self.path.startswith(prefix) else None
+        if body is None:
+            self.send_error(404)
+            return
+        headers = [("Cache-Control", "no-store"), ("Vary", "Origin")]
+        if origin is not None:
+            headers.append(("Access-Control-Allow-Origin", origin))
+        self.send_body(body, "application/json", headers)
+
+
+_endpoint = Endpoint(_StateHandler, "live-state-http")
+
+
+def serve_state(port, app_port, host="127.0.0.1"):
+    """
+    Starts the state endpoint once per process. `app_port` is the Streamlit server's port,
+    whose pages may read the state. Returns False if the port is unavailable.
+    """
+    global _app_port
+    _app_port = app_port
+    return _endpoint.start(port, host)
+
+
+# --- Browser Overlay ---
+_OVERLAY_TEMPLATE = """
+<div style="position:relative;width:100%;">
+  <video id="preview" autoplay muted playsinline style="width:100%;display:block;"></video>
+  <canvas id="overlay" style="position:absolute;left:0;top:0;width:100%;height:100%;"></canvas>
+</div>
+<script>
+const CONFIG = __CONFIG__;
+const video = document.getElementById("preview");
+const canvas = document.getElementById("overlay");
+const ctx = canvas.getContext("2d");
+let state = null;
+
+navigator.mediaDevices.getUserMedia({video: true, audio: false}).then(stream => { video.srcObject = stream; });
+
+let host = "localhost";
+try { host = window.parent.location.hostname || host; } catch (e) {}
+const url = `http://${host}:${CONFIG.port}/state/${CONFIG.key}`;
+
+async function poll() {
+  try {
+    const response = await fetch(url, {cache: "no-store"});
+    if (response.ok) state = await response.json();
+  } catch (e) {}
+  setTimeout(poll, CONFIG.pollMs);
+}
+
+function formatTime(seconds) {
+  seconds = Math.max(0, Math.floor(seconds));
+  const pad = n => String(n).padStart(2, "0");
+  return `${pad(Math.floor(seconds / 3600))}:${pad(Math.floor(seconds % 3600 / 60))}:${pad(seconds % 60)}`;
+}
+
+function text(value, x, y, color, size) {
+  ctx.font = `bold ${size}px sans-serif`;
+  ctx.lineWidth = 3;
+  ctx.strokeStyle = "black";
+  ctx.strokeText(value, x, y);
+  ctx.fillStyle = color;
+  ctx.fillText(value, x, y);
+}
+
+function draw() {
+  canvas.width = video.videoWidth || canvas.clientWidth;
+  canvas.height = video.videoHeight || canvas.clientHeight;
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  if (state) {
+    const points = state.landmarks;
+    if (points) {
+      const xy = i => [points[i * 3] / CONFIG.coordScale * canvas.width, points[i * 3 + 1] / CONFIG.coordScale * canvas.height];
+      const visible = i => points[i * 3 + 2] >= CONFIG.minVisibility;
+      ctx.strokeStyle = "white";
+      ctx.lineWidth = 2;
+      for (const [a, b] of CONFIG.connections) {
+        if (!visible(a) || !visible(b)) continue;
+        ctx.beginPath(); ctx.moveTo(...xy(a)); ctx.lineTo(...xy(b)); ctx.stroke();
+      }
+      ctx.fillStyle = "red";
+      for (let i = 0; i < points.length / 3; i++) {
+        if (!visible(i)) continue;
+        const [x, y] = xy(i);
+        ctx.beginPath(); ctx.arc(x, y, 3, 0, 2 * Math.PI); ctx.fill();
+      }
+    } else {
+      text("No body detected", 10, 30, "red", 18);
+    }
+    const timed = state.timed;
+    text(`Exercise: ${state.exercise}`, 10, 30, "white", 18);
+    text(timed ? `Time: ${state.counter.toFixed(1)}s` : `Reps: ${Math.floor(state.counter)}`, 10, 70, "cyan", 26);
+    text(`Session: ${formatTime(state.elapsed)}`, 10, 110, "orange", 18);
+    text(`FPS: ${state.fps.toFixed(1)}`, canvas.width - 120, 30, "yellow", 18);
+    text(`Form: ${state.form_ok ? "OK" : "BAD"}`, 10, 150, state.form_ok ? "lime" : "red", 18);
+    text(state.message, 10, 190, "white", 18);
+    if (state.angle !== null) text(`${CONFIG.angleLabel}: ${state.angle.toFixed(1)} deg`, 10, 230, "white", 18);
+  }
+  requestAnimationFrame(draw);
+}
+
+poll();
+requestAnimationFrame(draw);
+</script>
+"""
+
+
+def overlay_html(key, port, angle_label="Angle", connections=(), poll_ms=66, min_visibility=0.5):
+    """HTML for the component that previews the camera and draws a session's published state."""
+    config = {
+        "key": key, "port": port, "pollMs": poll_ms, "angleLabel": angle_label,
+        "connections": [list(pair) for pair in connections],
+        "coordScale": COORD_SCALE, "minVisibility": min_visibility * VIS_SCALE,
+    }
+    return _OVERLAY_TEMPLATE.replace("__CONFIG__", json.dumps(config))
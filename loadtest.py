@@ -0,0 +1,401 @@
+"""
+Multi-session load test over a local WebRTC loopback.
+
+    python loadtest.py --exercise Push-up --sessions 1 2 4 8 --video workout.mp4
+    python loadtest.py --sessions 1 2 4 --option pose_workers=2 --out capacity.json
+
+The server runs in its own process and answers offers the way webrtc_streamer does
+for the live page (SENDRECV, async_transform=True, one tracker per session), with all
+sessions sharing one event loop. Local peers replay a video file, or synthetic frames
+of a drawn figure, in place of browser webcams. Each frame carries its sequence
+number as a block code in the bottom-left corner, so the harness can match the
+annotated frames coming back to the frames it sent. For each session count it
+reports output FPS, returned FPS (distinct source frames sent back), analysed and
+inferred FPS as counted by the trackers, end-to-end latency and the server's CPU and
+RSS, and the largest session count that still meets the FPS and latency targets.
+Async inference composites most returned frames with the latest landmarks, so only
+the analysed FPS says how many frames the exercise logic actually saw.
+
+The replaying peers run on the same host, so their encoding work competes with the
+server for CPU; pin the server with --server-cpus to keep the two apart.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+CODE_BITS = 16
+CODE_BLOCK = 16 # Pixels per bit; large enough to survive VP8
+GUARD = (1, 0) # Fixed leading blocks, used to reject frames whose code was drawn over
+
+
+# --- Frame Sequence Codes ---
+def stamp(image, seq):
+    """Writes `seq` into the bottom-left corner of a BGR frame."""
+    height = image.shape[0]
+    bits = GUARD + tuple((seq >> i) & 1 for i in range(CODE_BITS))
+    for i, bit in enumerate(bits):
+        image[height - CODE_BLOCK:height, i * CODE_BLOCK:(i + 1) * CODE_BLOCK] = 255 if bit else 0
+
+
+def read_stamp(image):
+    """Returns the sequence number written by stamp(), or None if it can't be read."""
+    height = image.shape[0]
+    inner = CODE_BLOCK // 4
+    rows = image[height - CODE_BLOCK + inner:height - inner]
+    bits = []
+    for i in range(len(GUARD) + CODE_BITS):
+        level = rows[:, i * CODE_BLOCK + inner:(i + 1) * CODE_BLOCK - inner].mean()
+        if 64 < level < 192:
+            return None
+        bits.append(1 if level >= 128 else 0)
+    if tuple(bits[:len(GUARD)]) != GUARD:
+        return None
+    return sum(bit << i for i, bit in enumerate(bits[len(GUARD):]))
+
+
+def load_frames(video, width, height, limit=300):
+    """Source frames for the replaying peers: a video file, or a synthetic figure doing reps."""
+    import cv2
+
+    frames = []
+    if video:
+        capture = cv2.VideoCapture(video)
+        while len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(cv2.resize(frame, (width, height)))
+        capture.release()
+        if not frames:
+            raise SystemExit(f"Could not read any frames from {video}")
+    else:
+        from bench import synthetic_frame
+        for i in range(30):
+            frames.append(synthetic_frame(width, height, 175.0 - 125.0 * (0.5 - 0.5 * np.cos(2 * np.pi * i / 30))))
+    return frames
+
+
+# --- Server Process ---
+def _usage(pid="self"):
+    """(cpu seconds, rss bytes) for a process and its children (the pose workers)."""
+    if not os.path.exists("/proc/self/stat"):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024
+    pids = [str(os.getpid()) if pid == "self" else str(pid)]
+    cpu, rss = 0.0, 0
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{current}/statm") as f:
+                rss += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            cpu += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, IndexError, ValueError):
+            continue
+        # Children are listed under the thread that spawned them (pose workers come from the
+        # webrtc loop thread, not the main thread), so every task has to be checked
+        try:
+            tasks = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pids.extend(f.read().split())
+            except OSError:
+                continue
+    return cpu, rss
+
+
+async def _answer(sessions, session_id, sdp, exercise, options):
+    from aiortc import RTCPeerConnection, RTCSessionDescription
+    from aiortc.contrib.media import MediaRelay
+    from streamlit_webrtc import WebRtcMode
+    from streamlit_webrtc.webrtc import _process_offer_coro
+    from trackers import TRACKER_MAPPING
+
+    pc = RTCPeerConnection()
+    tracks = {}
+    # Same construction as the live page's video_transformer_factory
+    tracker = TRACKER_MAPPING[exercise](time.time(), **{"async_inference": True, **options})
+    description = await _process_offer_coro(
+        WebRtcMode.SENDRECV, pc, RTCSessionDescription(sdp, "offer"), relay=MediaRelay(),
+        source_video_track=None, source_audio_track=None, in_recorder=None, out_recorder=None,
+        video_processor=tracker, audio_processor=None, video_receiver=None, audio_receiver=None,
+        async_processing=True, sendback_video=True, sendback_audio=False,
+        on_track_created=tracks.__setitem__, remote_description_set_event=asyncio.Event(),
+    )
+    sessions[session_id] = (pc, tracks, tracker)
+    return description.sdp
+
+
+def _frame_counts(sessions):
+    """{session_id: (frames analysed, frames inferred)} for the server's trackers."""
+    counts = {}
+    for session_id, (_, _, tracker) in list(sessions.items()):
+        snapshot = tracker.snapshot
+        counts[session_id] = (snapshot.telemetry_total if snapshot is not None else 0, tracker.frames_inferred)
+    return counts
+
+
+async def _hang_up(sessions, session_id):
+    pc, tracks, _ = sessions.pop(session_id)
+    await pc.close()
+    output = tracks.get("output:video")
+    if output is not None and output.readyState == "live":
+        output.stop() # Also ends the tracker through on_ended()
+
+
+def _server_main(connection, exercise, options, cpus):
+    """Answers offers from the harness until told to stop."""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    # streamlit-webrtc warns on every transform() call
+    logging.getLogger("streamlit_webrtc").setLevel(logging.ERROR)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="webrtc-loop", daemon=True).start()
+    sessions = {}
+    while True:
+        message = connection.recv()
+        kind = message[0]
+        if kind == "stop":
+            break
+        try:
+            if kind == "offer":
+                _, session_id, sdp = message
+                reply = asyncio.run_coroutine_threadsafe(
+                    _answer(sessions, session_id, sdp, exercise, options), loop).result()
+            elif kind == "close":
+                asyncio.run_coroutine_threadsafe(_hang_up(sessions, message[1]), loop).result()
+                reply = None
+            elif kind == "usage":
+                cpus_available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+                import metrics
+                reply = (time.monotonic(), *_usage(), cpus_available, metrics.snapshot()["all"], _frame_counts(sessions))
+            connection.send(("ok", reply))
+        except Exception as e:
+            connection.send(("error", repr(e)))
+    for session_id in list(sessions):
+        asyncio.run_coroutine_threadsafe(_hang_up(sessions, session_id), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+class ServerProcess:
+    """The app side of the loopback, in a separate process so its CPU and memory can be measured."""
+    def __init__(self, exercise, options, cpus=None):
+        context = multiprocessing.get_context("spawn")
+        self._connection, child = context.Pipe()
+        # Not a daemon: with pose_workers > 0 the server starts its own worker processes
+        self._process = context.Process(target=_server_main, args=(child, exercise, options, cpus), name="loadtest-server")
+        self._process.start()
+        self._lock = threading.Lock()
+
+    def call(self, *message):
+        with self._lock:
+            self._connection.send(message)
+            status, reply = self._connection.recv()
+        if status == "error":
+            raise RuntimeError(f"Server failed on {message[0]}: {reply}")
+        return reply
+
+    def stop(self):
+        with self._lock:
+            self._connection.send(("stop",))
+        self._process.join(30)
+
+
+# --- Replaying Peers ---
+def _replay_track_class():
+    from aiortc import VideoStreamTrack
+
+    class ReplayTrack(VideoStreamTrack):
+        """Sends the source frames in a loop at 30 FPS, stamped with their sequence numbers."""
+        def __init__(self, frames, sent):
+            super().__init__()
+            self.frames = frames
+            self.sent = sent
+            self.seq = 0
+
+        async def recv(self):
+            import av
+
+            pts, time_base = await self.next_timestamp()
+            image = self.frames[self.seq % len(self.frames)].copy()
+            stamp(image, self.seq % (1 << CODE_BITS))
+            frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+            frame.pts, frame.time_base = pts, time_base
+            self.sent[self.seq % (1 << CODE_BITS)] = time.perf_counter()
+            self.seq += 1
+            return frame
+
+    return ReplayTrack
+
+
+class Session:
+    """One replaying peer and the statistics of the frames it gets back."""
+    def __init__(self, session_id, frames):
+        self.session_id = session_id
+        self.frames = frames
+        self.sent = {}
+        self.pc = None
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.seen = set()
+        self.latencies = []
+        self.unreadable = 0
+
+    async def connect(self, server, loop):
+        from aiortc import RTCPeerConnection, RTCSessionDescription
+
+        self.pc = RTCPeerConnection()
+        self.pc.addTrack(_replay_track_class()(self.frames, self.sent))
+
+        @self.pc.on("track")
+        def on_track(track):
+            asyncio.ensure_future(self._consume(track))
+
+        await self.pc.setLocalDescription(await self.pc.createOffer())
+        answer = await loop.run_in_executor(None, server.call, "offer", self.session_id, self.pc.localDescription.sdp)
+        await self.pc.setRemoteDescription(RTCSessionDescription(answer, "answer"))
+
+    async def _consume(self, track):
+        from aiortc.mediastreams import MediaStreamError
+
+        while True:
+            try:
+                frame = await track.recv()
+            except MediaStreamError:
+                return
+            arrived = time.perf_counter()
+            self.received += 1
+            seq = read_stamp(frame.to_ndarray(format="bgr24"))
+            if seq is None:
+                self.unreadable += 1
+                continue
+            if seq in self.seen:
+                continue # The async transform repeats its last output while the next frame is processed
+            self.seen.add(seq)
+            sent = self.sent.pop(seq, None)
+            if sent is not None:
+                self.latencies.append(arrived - sent)
+
+    async def close(self, server, loop):
+        await loop.run_in_executor(None, server.call, "close", self.session_id)
+        await self.pc.close()
+
+
+async def run_step(server, frames, count, warmup, duration):
+    loop = asyncio.get_running_loop()
+    sessions = [Session(f"s{count}-{i}", frames) for i in range(count)]
+    await asyncio.gather(*(session.connect(server, loop) for session in sessions))
+    await asyncio.sleep(warmup)
+
+    for session in sessions:
+        session.reset()
+    start_time, start_cpu, _, cpus, _, start_counts = server.call("usage")
+    await asyncio.sleep(duration)
+    end_time, end_cpu, rss, _, stages, end_counts = server.call("usage")
+    results = [(session.received, len(session.seen), list(session.latencies), session.unreadable) for session in sessions]
+
+    await asyncio.gather(*(session.close(server, loop) for session in sessions))
+    elapsed = end_time - start_time
+    latencies = np.array([value for _, _, values, _ in results for value in values]) * 1000.0
+    output_fps = [received / elapsed for received, _, _, _ in results]
+    returned_fps = [unique / elapsed for _, unique, _, _ in results]
+    # Frames the trackers analysed and ran the pose model on, from their own counters
+    counts = [(end_counts[session.session_id], start_counts.get(session.session_id, (0, 0))) for session in sessions]
+    analyzed_fps = [(end[0] - start[0]) / elapsed for end, start in counts]
+    inferred_fps = [(end[1] - start[1]) / elapsed for end, start in counts]
+    return {
+        "sessions": count,
+        "output_fps_median": float(np.median(output_fps)),
+        "returned_fps_median": float(np.median(returned_fps)),
+        "analyzed_fps_median": float(np.median(analyzed_fps)),
+        "analyzed_fps_min": float(np.min(analyzed_fps)),
+        "inferred_fps_median": float(np.median(inferred_fps)),
+        "latency_p50_ms": float(np.percentile(latencies, 50)) if latencies.size else None,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) if latencies.size else None,
+        "latency_p99_ms": float(np.percentile(latencies, 99)) if latencies.size else None,
+        "unreadable_frames": sum(unreadable for _, _, _, unreadable in results),
+        "server_cpu_percent": 100.0 * (end_cpu - start_cpu) / elapsed,
+        "server_rss_mb": rss / 2 ** 20,
+        "server_cpus": cpus,
+        "server_stages": stages,
+    }
+
+
+def parse_option(text):
+    """key=value, with the value parsed as JSON when possible (numbers, true/false, null)."""
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test concurrent tracker sessions over a local WebRTC loopback.")
+    parser.add_argument("--exercise", default="Push-up", help="Tracker to run in every session.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Session counts to try.")
+    parser.add_argument("--video", help="Video file to replay (default: synthetic frames).")
+    parser.add_argument("--size", default="640x480", help="Frame size sent by each peer.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds before measuring each step.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds measured per step.")
+    parser.add_argument("--min-fps", type=float, default=None, help="Analysed FPS a session needs (default: PIPELINE target_fps).")
+    parser.add_argument("--max-latency-ms", type=float, default=250.0, help="p95 end-to-end latency allowed.")
+    parser.add_argument("--option", action="append", default=[], help="PIPELINE override for the server, e.g. pose_workers=2.")
+    parser.add_argument("--server-cpus", help="Comma-separated CPUs to pin the server process to.")
+    parser.add_argument("--out", default="loadtest_results.json", help="Where to write the JSON results.")
+    args = parser.parse_args(argv)
+
+    from trackers import PIPELINE
+
+    options = dict(parse_option(text) for text in args.option)
+    min_fps = args.min_fps if args.min_fps is not None else PIPELINE["target_fps"]
+    width, height = (int(v) for v in args.size.split("x"))
+    frames = load_frames(args.video, width, height)
+    cpus = {int(cpu) for cpu in args.server_cpus.split(",")} if args.server_cpus else None
+
+    server = ServerProcess(args.exercise, options, cpus)
+    steps = []
+    try:
+        for count in args.sessions:
+            step = asyncio.run(run_step(server, frames, count, args.warmup, args.duration))
+            step["meets_target"] = (step["analyzed_fps_min"] >= min_fps and step["latency_p95_ms"] is not None
+                                    and step["latency_p95_ms"] <= args.max_latency_ms)
+            steps.append(step)
+            print(f"{count:>3} sessions: {step['output_fps_median']:5.1f} out fps, {step['returned_fps_median']:5.1f} "
+                  f"returned fps, {step['analyzed_fps_median']:5.1f} analysed fps (min {step['analyzed_fps_min']:.1f}), "
+                  f"{step['inferred_fps_median']:5.1f} inferred fps, p95 {step['latency_p95_ms'] or float('nan'):6.0f} ms, "
+                  f"cpu {step['server_cpu_percent']:5.0f}%, rss {step['server_rss_mb']:6.0f} MB"
+                  f"{'' if step['meets_target'] else '  (below target)'}", flush=True)
+    finally:
+        server.stop()
+
+    capacity = max((step["sessions"] for step in steps if step["meets_target"]), default=0)
+    server_cpus = steps[0]["server_cpus"] if steps else os.cpu_count()
+    report = {
+        "exercise": args.exercise, "options": options, "frame_size": args.size, "video": args.video,
+        "targets": {"min_fps": min_fps, "max_latency_p95_ms": args.max_latency_ms},
+        "steps": steps, "capacity_sessions": capacity, "sessions_per_core": capacity / server_cpus,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Capacity: {capacity} sessions ({report['sessions_per_core']:.2f} per core)")
+    return 0 if capacity else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Small HTTP endpoints served next to the Streamlit app: stage metrics and the
+landmarks-only session state. Each is started at most once per server process,
+on a daemon thread, and binds to localhost unless told otherwise.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that answers with a single body and does not log every request."""
+    def send_body(self, body, content_type, headers=()):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Endpoint:
+    """An HTTP server for one handler class, started at most once per process."""
+    def __init__(self, handler, name):
+        self.handler = handler
+        self.name = name
+        self.server = None
+        self._lock = threading.Lock()
+
+    def start(self, port, host="127.0.0.1"):
+        """Starts serving unless already started. Returns False if the port is unavailable."""
+        with self._lock:
+            if self.server is not None:
+                return True
+            try:
+                self.server = ThreadingHTTPServer((host, port), self.handler)
+            except OSError:
+                return False
+            threading.Thread(target=self.server.serve_forever, name=self.name, daemon=True).start()
+            return True
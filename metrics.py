@@ -0,0 +1,110 @@
+"""
+Per-stage timing of the frame pipeline.
+
+Each tracker owns a StageTimings with a rolling window of samples per stage
+(to_ndarray, cvtColor, pose.process, draw_landmarks, calculate_metrics,
+update_state, putText and the whole frame). Live sessions register their timings so
+they can be shown in the sidebar and dumped for a local scraper:
+
+    curl http://127.0.0.1:9108/metrics        # Prometheus text format
+    curl http://127.0.0.1:9108/metrics.json
+"""
+import json
+import weakref
+from collections import deque
+
+import numpy as np
+
+from local_http import Endpoint, QuietHandler
+
+QUANTILES = (50, 95, 99)
+
+
+class StageTimings:
+    """Rolling latency samples (seconds) for each pipeline stage."""
+    def __init__(self, label="", window=600):
+        self.label = label
+        self.window = window
+        self._stages = {}
+
+    def record(self, stage, seconds):
+        samples = self._stages.get(stage)
+        if samples is None:
+            samples = self._stages[stage] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def samples(self):
+        """Returns {stage: copy of its samples}."""
+        return {stage: list(samples) for stage, samples in list(self._stages.items())}
+
+    def summary(self):
+        """Returns {stage: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"}} over the window."""
+        return summarize(self.samples())
+
+
+def summarize(stage_samples):
+    summary = {}
+    for stage, samples in stage_samples.items():
+        if not samples:
+            continue
+        values = np.asarray(samples) * 1000.0
+        p50, p95, p99 = np.percentile(values, QUANTILES)
+        summary[stage] = {
+            "count": len(values), "mean_ms": float(values.mean()),
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+        }
+    return summary
+
+
+# --- Registry of live sessions ---
+_sessions = weakref.WeakValueDictionary()
+
+
+def register(timings):
+    _sessions[timings.label] = timings
+
+
+def unregister(timings):
+    _sessions.pop(timings.label, None)
+
+
+def snapshot():
+    """Summaries of every live session, plus an 'all' entry pooling their samples."""
+    sessions = {label: timings.samples() for label, timings in list(_sessions.items())}
+    pooled = {}
+    for stage_samples in sessions.values():
+        for stage, samples in stage_samples.items():
+            pooled.setdefault(stage, []).extend(samples)
+    result = {label: summarize(stage_samples) for label, stage_samples in sessions.items()}
+    result["all"] = summarize(pooled)
+    return result
+
+
+def to_text(metrics):
+    """Renders a snapshot in the Prometheus text exposition format."""
+    lines = ["# TYPE pocket_coach_stage_seconds summary"]
+    for session, stages in metrics.items():
+        for stage, stats in stages.items():
+            labels = f'session="{session}",stage="{stage}"'
+            for q in QUANTILES:
+                lines.append(f'pocket_coach_stage_seconds{{{labels},quantile="{q / 100}"}} {stats[f"p{q}_ms"] / 1000.0:.6f}')
+            lines.append(f"pocket_coach_stage_seconds_count{{{labels}}} {stats['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(QuietHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.send_body(to_text(snapshot()).encode(), "text/plain; version=0.0.4")
+        elif self.path == "/metrics.json":
+            self.send_body(json.dumps(snapshot()).encode(), "application/json")
+        else:
+            self.send_error(404)
+
+
+_endpoint = Endpoint(_MetricsHandler, "metrics-http")
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Starts the metrics endpoint once per process. Returns False if the port is unavailable."""
+    return _endpoint.start(port, host)
@@ -0,0 +1,74 @@
+"""
+Cached text overlay for the annotated video.
+
+Most of the overlay text changes a few times per second at most ("Exercise: Push-up"
+never does), but cv2.putText rasterizes every string on every frame. The
+OverlayCompositor keeps each text panel rendered in a cached patch with an alpha
+mask, re-renders a panel only when its text, position or style changes, and copies
+the whole patch onto the frame in one masked operation.
+"""
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# Sums the channels (saturating), so every drawn pixel gets a non-zero alpha
+_ANY_CHANNEL = np.ones((1, 3), dtype=np.float32)
+
+
+class OverlayCompositor:
+    """Text panels rendered into a cached BGR patch plus mask, composited onto frames."""
+    def __init__(self):
+        self._shape = None
+        self._patch = None
+        self._alpha = None
+        self._panels = {} # name -> (text, org, color, scale, thickness), (x0, y0, x1, y1)
+        self._bounds = None # Union of all panel boxes
+
+    def _reset(self, shape):
+        self._shape = shape
+        self._patch = np.zeros(shape, dtype=np.uint8)
+        self._alpha = np.zeros(shape[:2], dtype=np.uint8)
+        self._panels.clear()
+        self._bounds = None
+
+    def text(self, name, text, org, color, scale=0.7, thickness=2):
+        """Sets a panel's text; only rasterized when something about it changed."""
+        style = (text, org, color, scale, thickness)
+        previous = self._panels.get(name)
+        if previous is not None and previous[0] == style:
+            return
+
+        height, width = self._shape[:2]
+        if previous is not None:
+            x0, y0, x1, y1 = previous[1]
+            self._patch[y0:y1, x0:x1] = 0
+            self._alpha[y0:y1, x0:x1] = 0
+
+        (text_width, text_height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        x, y = org
+        box = (max(0, x - thickness), max(0, y - text_height - thickness),
+               min(width, x + text_width + thickness), min(height, y + baseline + thickness))
+        x0, y0, x1, y1 = box
+        if x1 > x0 and y1 > y0:
+            cv2.putText(self._patch, text, org, FONT, scale, color, thickness)
+            # putText draws without anti-aliasing, so alpha is either fully on or off
+            self._alpha[y0:y1, x0:x1] = cv2.transform(self._patch[y0:y1, x0:x1], _ANY_CHANNEL)
+        self._panels[name] = (style, box)
+        self._bounds = None
+
+    def begin(self, frame):
+        """Prepares for a frame; the cache is rebuilt if the frame size changed."""
+        if frame.shape != self._shape:
+            self._reset(frame.shape)
+
+    def composite(self, frame):
+        """Copies every panel onto the frame in one masked copy over their bounding box."""
+        if not self._panels:
+            return frame
+        if self._bounds is None:
+            boxes = np.array([box for _, box in self._panels.values()])
+            self._bounds = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+        x0, y0, x1, y1 = self._bounds
+        cv2.copyTo(self._patch[y0:y1, x0:x1], self._alpha[y0:y1, x0:x1], frame[y0:y1, x0:x1])
+        return frame
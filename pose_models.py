@@ -0,0 +1,138 @@
+"""
+Lifecycle management for MediaPipe Pose graphs.
+
+Building a Pose graph and running its first frame costs a few hundred milliseconds,
+and graphs that are never closed keep their native resources alive. Sessions check a
+warmed-up graph out of a PoseInstancePool when they start and check it back in when
+they stop; idle graphs are closed after a while.
+"""
+import threading
+import time
+
+import mediapipe as mp
+import numpy as np
+
+DEFAULT_POSE_OPTIONS = dict(
+    static_image_mode=False, model_complexity=1,
+    min_detection_confidence=0.5, min_tracking_confidence=0.5
+)
+
+# A frame without a person: primes the detector on new graphs and makes a used graph
+# drop the previous session's tracked body without restarting the graph
+_BLANK_FRAME = np.zeros((64, 64, 3), dtype=np.uint8)
+
+
+def _key(pose_options):
+    return tuple(sorted({**DEFAULT_POSE_OPTIONS, **pose_options}.items()))
+
+
+class PoseInstancePool:
+    """Pre-warmed Pose graphs, keyed by their options (model_complexity, confidences)."""
+    def __init__(self, idle_timeout=300.0, max_idle=4):
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle # Per key
+        self._lock = threading.Lock()
+        self._idle = {} # key -> [(pose, returned_at)], most recently used last
+        self._options = {} # id(pose) -> key for checked-out graphs
+        self._timer = None # Runs evict_idle when the oldest idle graph expires
+
+    def _create(self, key):
+        pose = mp.solutions.pose.Pose(**dict(key))
+        pose.process(_BLANK_FRAME)
+        return pose
+
+    def checkout(self, **pose_options):
+        """Returns a warm graph with no tracking state, creating one if none is idle."""
+        key = _key(pose_options)
+        self.evict_idle()
+        with self._lock:
+            idle = self._idle.get(key)
+            pose = idle.pop()[0] if idle else None
+        if pose is None:
+            pose = self._create(key)
+        with self._lock:
+            self._options[id(pose)] = key
+        return pose
+
+    def checkin(self, pose):
+        """Resets a graph's tracking state and keeps it for the next session."""
+        with self._lock:
+            key = self._options.pop(id(pose), None)
+        if key is None:
+            pose.close()
+            return
+
+        pose.process(_BLANK_FRAME)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            idle.append((pose, time.monotonic()))
+            surplus = idle[:-self.max_idle] if len(idle) > self.max_idle else []
+            del idle[:len(surplus)]
+            self._schedule_eviction()
+        for stale, _ in surplus:
+            stale.close()
+        self.evict_idle()
+
+    def prewarm(self, count=1, **pose_options):
+        """Makes sure at least `count` idle graphs exist for these options."""
+        key = _key(pose_options)
+        with self._lock:
+            missing = count - len(self._idle.get(key, []))
+        for _ in range(missing):
+            pose = self._create(key)
+            with self._lock:
+                self._idle.setdefault(key, []).append((pose, time.monotonic()))
+                self._schedule_eviction()
+
+    def evict_idle(self):
+        """Closes graphs that have been idle for longer than idle_timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = [item for item in idle if item[1] >= cutoff]
+                expired.extend(pose for pose, returned_at in idle if returned_at < cutoff)
+                idle[:] = keep
+            self._schedule_eviction()
+        for pose in expired:
+            pose.close()
+
+    def _schedule_eviction(self):
+        # Called with the lock held. Without a timer, graphs would only expire when the next session starts
+        if self._timer is not None:
+            return
+        returned = [returned_at for idle in self._idle.values() for _, returned_at in idle]
+        if not returned:
+            return
+        delay = max(0.0, min(returned) + self.idle_timeout - time.monotonic())
+        self._timer = threading.Timer(delay, self._evict_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _evict_on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.evict_idle()
+
+    def close(self):
+        with self._lock:
+            idle = [pose for items in self._idle.values() for pose, _ in items]
+            self._idle.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for pose in idle:
+            pose.close()
+
+
+_default_instances = None
+_default_instances_lock = threading.Lock()
+
+
+def get_pose_instances():
+    """Returns the process-wide pool of Pose graphs."""
+    global _default_instances
+    with _default_instances_lock:
+        if _default_instances is None:
+            _default_instances = PoseInstancePool()
+        return _default_instances
@@ -0,0 +1,364 @@
+"""
+Out-of-process pose inference.
+
+A PosePool runs MediaPipe in a set of worker processes, so concurrent sessions are
+not serialized on one interpreter and its GIL. Each session gets its own Pose graph
+in one worker (MediaPipe tracks between frames, so a session always goes to the same
+worker). Frames and landmarks travel through a per-session shared-memory ring; only
+small control tuples go through the queues, and results come back on a pipe per worker.
+"""
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, TimeoutError
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS, landmarks_to_array
+
+LANDMARK_BYTES = NUM_LANDMARKS * 4 * np.dtype(np.float32).itemsize
+DEFAULT_SLOT_BYTES = 1280 * 720 * 3 # Enough for any frame downscaled to a 720 short side
+CONFIGURE_TIMEOUT = 30.0 # Seconds; lite/heavy models are downloaded on first use
+
+
+class FrameRing:
+    """Shared-memory ring of frame slots, each with a landmark slot for its result."""
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * (slot_bytes + LANDMARK_BYTES))
+        else:
+            # Workers share the creating process' resource tracker, which unlinks on close
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def frame(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def landmarks(self, slot):
+        offset = self.slots * self.slot_bytes + slot * LANDMARK_BYTES
+        return np.ndarray((NUM_LANDMARKS, 4), dtype=np.float32, buffer=self.shm.buf, offset=offset)
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker_main(requests, results):
+    """Worker process loop: owns one Pose graph per session assigned to it."""
+    from pose_models import get_pose_instances
+
+    instances = get_pose_instances()
+    sessions = {}
+    while True:
+        message = requests.get()
+        if message is None:
+            break
+        kind, session_id = message[0], message[1]
+        # One bad message (a model that fails to load, an unknown session) must not end the
+        # loop: every session on this worker would stop getting results
+        try:
+            _handle_request(message, instances, sessions, results)
+        except Exception as e:
+            print(f"Warning: pose worker failed to handle {kind!r} for session {session_id}: {e!r}")
+
+    for pose, ring in sessions.values():
+        pose.close()
+        ring.close()
+    instances.close()
+    results.close()
+
+
+def _handle_request(message, instances, sessions, results):
+    kind, session_id = message[0], message[1]
+
+    if kind == "open":
+        # Also used to swap in a larger ring; the session keeps its Pose graph
+        _, _, ring_name, slots, slot_bytes, pose_options = message
+        pose, ring = sessions.pop(session_id, (None, None))
+        if ring is not None:
+            ring.close()
+        if pose is None:
+            pose = instances.checkout(**pose_options)
+        sessions[session_id] = (pose, FrameRing(slots, slot_bytes, name=ring_name))
+
+    elif kind == "frame":
+        _, _, seq, slot, shape = message
+        found = False
+        try:
+            # A session whose graph failed to load has no entry and reports "no body"
+            pose, ring = sessions[session_id]
+            detection = pose.process(ring.frame(slot, shape)).pose_landmarks
+            if detection:
+                landmarks_to_array(detection, ring.landmarks(slot))
+                found = True
+        except Exception:
+            pass
+        results.send((session_id, seq, found))
+
+    elif kind == "configure":
+        # New graph options (e.g. model_complexity); keep the old graph if the new one fails to load
+        _, _, seq, pose_options = message
+        switched = False
+        try:
+            pose, ring = sessions[session_id]
+            new_pose = instances.checkout(**pose_options)
+            instances.checkin(pose)
+            sessions[session_id] = (new_pose, ring)
+            switched = True
+        finally:
+            # The client waits for the outcome, failed or not
+            results.send((session_id, seq, switched))
+
+    elif kind == "close":
+        pose, ring = sessions.pop(session_id, (None, None))
+        if pose is not None:
+            instances.checkin(pose)
+            ring.close()
+
+
+class PoseClient:
+    """A session's handle on the pool: submits RGB frames and reads back landmark arrays."""
+    def __init__(self, pool, session_id, worker, pose_options, slots=2, slot_bytes=DEFAULT_SLOT_BYTES):
+        self._pool = pool
+        self._requests = pool.requests(worker)
+        self._generation = pool.generation(worker)
+        self.session_id = session_id
+        self.worker = worker
+        self.pose_options = pose_options
+        self._seq = itertools.count()
+        self._in_flight = {}
+        self._ring = None
+        self._open_ring(slots, slot_bytes)
+
+    def _open_ring(self, slots, slot_bytes):
+        old = self._ring
+        self._ring = FrameRing(slots, slot_bytes)
+        self._requests.put(("open", self.session_id, self._ring.name, slots, slot_bytes, self.pose_options))
+        if old is not None:
+            old.close(unlink=True)
+
+    def configure(self, **pose_options):
+        """
+        Switches the session to a graph with other options, e.g. a different model_complexity.
+        Returns False, with the session still on its current graph, if the worker could not load it.
+        """
+        seq = next(self._seq)
+        future = self._pool.expect(self.session_id, seq)
+        self._requests.put(("configure", self.session_id, seq, pose_options))
+        if not self._wait(future, CONFIGURE_TIMEOUT):
+            return False
+        self.pose_options = pose_options
+        return True
+
+    def submit(self, image):
+        """Copies an RGB frame into the ring and queues it. Returns a ticket for fetch()."""
+        if image.nbytes > self._ring.slot_bytes:
+            self._wait_all()
+            self._open_ring(self._ring.slots, image.nbytes)
+
+        seq = next(self._seq)
+        slot = seq % self._ring.slots
+        previous = self._in_flight.get(slot)
+        if previous is not None:
+            # Ring is full, the oldest frame has to finish before its slot is reused
+            self._wait(previous)
+            if self._in_flight.get(slot) is previous and not previous.done():
+                # The worker may still read that frame or write its landmarks: skip this one
+                return slot, None
+            self._in_flight.pop(slot, None)
+
+        self._ring.frame(slot, image.shape)[:] = image
+        future = self._pool.expect(self.session_id, seq)
+        self._in_flight[slot] = future
+        self._requests.put(("frame", self.session_id, seq, slot, image.shape))
+        return slot, future
+
+    def fetch(self, ticket, out, timeout=2.0):
+        """
+        Waits for a submitted frame. Writes its landmarks into `out`, or returns None if no body
+        was found, the frame was skipped or the worker did not answer in time.
+        """
+        slot, future = ticket
+        if future is None:
+            return None
+        found = self._wait(future, timeout)
+        # A frame that timed out keeps its slot until the late reply arrives or the worker restarts
+        if future.done() and self._in_flight.get(slot) is future:
+            del self._in_flight[slot]
+        if not found:
+            return None
+        out[:] = self._ring.landmarks(slot)
+        return out
+
+    def process(self, image, out, timeout=2.0):
+        """Runs pose on an RGB frame and waits for the result."""
+        return self.fetch(self.submit(image), out, timeout)
+
+    def _wait(self, future, timeout=2.0):
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # A dead worker never answers: restart it and move the session to the new process
+            if self._pool.ensure_worker(self.worker) != self._generation:
+                self._reopen()
+            return False
+
+    def _reopen(self):
+        """Opens the session again on its worker's new process, reusing the shared-memory ring."""
+        self._generation = self._pool.generation(self.worker)
+        self._requests = self._pool.requests(self.worker)
+        self._pool.forget(self.session_id)
+        self._in_flight.clear()
+        self._requests.put(("open", self.session_id, self._ring.name, self._ring.slots, self._ring.slot_bytes,
+                            self.pose_options))
+
+    def _wait_all(self):
+        for future in list(self._in_flight.values()):
+            self._wait(future)
+        self._in_flight.clear()
+
+    def close(self):
+        """Releases the session's Pose graph in the worker and its shared memory."""
+        if self._ring is None:
+            return
+        self._wait_all()
+        self._requests.put(("close", self.session_id))
+        self._ring.close(unlink=True)
+        self._ring = None
+        self._pool.release(self.worker)
+
+
+class PosePool:
+    """Pool of worker processes that own the pose models for all sessions."""
+    def __init__(self, workers=None, start_method="spawn"):
+        self._context = multiprocessing.get_context(start_method)
+        self._queues = []
+        self._processes = []
+        # One results pipe per worker: a worker killed mid-write would leave a shared queue's lock held
+        self._results = []
+        self._generations = []
+        self._session_counts = []
+        self._closed = False
+        for i in range(workers or os.cpu_count() or 1):
+            queue, process, results = self._start_worker(i)
+            self._queues.append(queue)
+            self._processes.append(process)
+            self._results.append(results)
+            self._generations.append(0)
+            self._session_counts.append(0)
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._session_ids = itertools.count()
+        # Wakes the dispatcher when the set of result pipes changes (True) or on shutdown (None)
+        self._wakeup, self._wakeup_sender = self._context.Pipe(duplex=False)
+        self._dispatcher = threading.Thread(target=self._dispatch, name="pose-results", daemon=True)
+        self._dispatcher.start()
+
+    def _start_worker(self, worker):
+        queue = self._context.Queue()
+        results, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_worker_main, args=(queue, sender),
+                                        name=f"pose-worker-{worker}", daemon=True)
+        process.start()
+        # The worker holds the only write end, so the pipe reports EOF once it exits
+        sender.close()
+        return queue, process, results
+
+    def ensure_worker(self, worker):
+        """Restarts the worker if its process has died. Returns its generation, which changes on restart."""
+        with self._lock:
+            if not self._closed and not self._processes[worker].is_alive():
+                print(f"Warning: pose worker {worker} died (exit code {self._processes[worker].exitcode}), restarting it.")
+                self._queues[worker], self._processes[worker], self._results[worker] = self._start_worker(worker)
+                self._generations[worker] += 1
+                self._wakeup_sender.send(True)
+            return self._generations[worker]
+
+    def generation(self, worker):
+        with self._lock:
+            return self._generations[worker]
+
+    def open_session(self, **pose_options):
+        """Assigns a new session to the least loaded worker and returns its client."""
+        with self._lock:
+            worker = min(range(len(self._queues)), key=self._session_counts.__getitem__)
+            self._session_counts[worker] += 1
+            session_id = next(self._session_ids)
+        return PoseClient(self, session_id, worker, pose_options)
+
+    def requests(self, worker):
+        with self._lock:
+            return self._queues[worker]
+
+    def expect(self, session_id, seq):
+        """Registers a future completed when the worker reports on (session_id, seq)."""
+        future = Future()
+        with self._lock:
+            self._pending[(session_id, seq)] = future
+        return future
+
+    def forget(self, session_id):
+        """Drops a session's pending results, e.g. those lost with a dead worker."""
+        with self._lock:
+            for key in [key for key in self._pending if key[0] == session_id]:
+                del self._pending[key]
+
+    def release(self, worker):
+        with self._lock:
+            self._session_counts[worker] -= 1
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                pipes = [pipe for pipe in self._results if not pipe.closed]
+            for pipe in wait(pipes + [self._wakeup]):
+                if pipe is self._wakeup:
+                    if pipe.recv() is None:
+                        return
+                    continue
+                try:
+                    session_id, seq, found = pipe.recv()
+                except Exception:
+                    # The worker exited, or died in the middle of a message; ensure_worker replaces it
+                    pipe.close()
+                    continue
+                with self._lock:
+                    future = self._pending.pop((session_id, seq), None)
+                if future is not None:
+                    future.set_result(found)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        for queue in self._queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join(5)
+        with self._lock:
+            self._wakeup_sender.send(None)
+        self._dispatcher.join(1)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pose_pool(workers=None):
+    """Returns the process-wide pool, starting it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PosePool(workers)
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
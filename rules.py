@@ -0,0 +1,295 @@
+"""
+Declarative exercise rules.
+
+An exercise is a dict in RULES: the joint whose angle drives it, the down/up thresholds,
+form constraints and whether it counts reps or times a hold. compile_rules() turns a
+set of rules into a RuleEvaluator, which computes every rule's main angle and form
+check from the landmark array with a handful of vectorized operations, however many
+rules it holds. The rep and hold state machines are shared by all exercises.
+
+Form constraints are {"feature": ..., "min": ..., "max": ...} with strict bounds:
+
+    line_offset      points (a, b, c): |y_b - (y_a + y_c) / 2|, b's distance from the a-c midline
+    height_diff      points (a, b): y_a - y_b, negative when a is above b
+    horizontal_dist  points (a, b): |x_a - x_b|
+    incline          points (a, b): angle of the a-b segment from horizontal, 0-90 degrees
+    angle            joint: a JOINTS angle in degrees
+
+A rule's "detect" constraints (same format) describe the body position of the
+exercise, e.g. lying or standing. Automatic exercise detection only considers rules
+whose detect constraints hold.
+"""
+import copy
+from functools import lru_cache
+
+import numpy as np
+
+from landmarks import JOINT_INDEX, LANDMARK_INDEX, X, Y
+
+RULES = {
+    "Push-up": {
+        "mode": "reps", "joint": "left_elbow", "down": 70.0, "up": 160.0,
+        "desc": "Elbows", "angle_label": "Elbow Angle",
+        # Hip too far up or down: poor plank form
+        "form": [{"feature": "line_offset", "points": ("left_shoulder", "left_hip", "left_ankle"), "max": 0.15}],
+        "form_gates_reps": True, # Don't reset state, but don't count reps while form is off
+        "messages": {"down": "Down! Now Push Up", "rep": "Nice Rep!", "waiting_down": None,
+                     "waiting_up": "Extend Arms Fully", "bad_form": "Adjust Form! (Hips/Back)"},
+        "detect": [{"feature": "incline", "points": ("left_shoulder", "left_ankle"), "max": 35.0}], # Lying
+    },
+    "Squat": {
+        "mode": "reps", "joint": "left_knee", "down": 90.0, "up": 170.0,
+        "desc": "Knees", "angle_label": "Knee Angle",
+        # Simple check for depth: hip should not drop below the knee line
+        "form": [{"feature": "height_diff", "points": ("left_hip", "left_knee"), "max": 0.0}],
+        "form_gates_reps": False,
+        "messages": {"down": "Deep Squat! Push Up", "rep": "Nice Rep!", "waiting_down": "Squat Deeper (Knee Angle)",
+                     "waiting_up": "Stand Up Fully", "bad_form": None},
+        # Upright, feet together (side view)
+        "detect": [{"feature": "incline", "points": ("left_shoulder", "left_ankle"), "min": 50.0},
+                   {"feature": "horizontal_dist", "points": ("left_ankle", "right_ankle"), "max": 0.15}],
+    },
+    "Plank": {
+        "mode": "hold", "down": 10.0, "up": 10.0, "desc": "Time",
+        # Near-straight shoulder-hip-ankle line, tighter than the push-up check
+        "form": [{"feature": "line_offset", "points": ("left_shoulder", "left_hip", "left_ankle"), "max": 0.05}],
+        "messages": {"start": "Form OK! HOLD", "holding": "HOLDING: {seconds}s", "bad_form": "BAD FORM! Adjust Hips/Back"},
+        "detect": [{"feature": "incline", "points": ("left_shoulder", "left_ankle"), "max": 35.0}], # Lying
+        # Holds barely move, so skip inference on static frames unless told otherwise
+        "options": {"motion_gate": True},
+    },
+    "Lunge": {
+        "mode": "reps", "joint": "left_knee", "down": 100.0, "up": 160.0,
+        "desc": "Front Knee", "angle_label": "Knee Angle",
+        # Torso upright: shoulder stays over the hip
+        "form": [{"feature": "horizontal_dist", "points": ("left_shoulder", "left_hip"), "max": 0.1}],
+        "form_gates_reps": True,
+        "messages": {"down": "Good Depth! Drive Up", "rep": "Nice Rep!", "waiting_down": "Lower Your Back Knee",
+                     "waiting_up": "Stand Tall", "bad_form": "Keep Your Torso Upright"},
+        # Upright, feet split front to back (side view)
+        "detect": [{"feature": "incline", "points": ("left_shoulder", "left_ankle"), "min": 50.0},
+                   {"feature": "horizontal_dist", "points": ("left_ankle", "right_ankle"), "min": 0.15}],
+    },
+}
+
+_FEATURES = ("line_offset", "height_diff", "horizontal_dist", "incline", "angle")
+_POINT_COUNTS = {"line_offset": 3, "height_diff": 2, "horizontal_dist": 2, "incline": 2}
+
+
+def _check_rule(name, rule):
+    if rule.get("mode") not in ("reps", "hold"):
+        raise ValueError(f"Rule {name!r}: mode must be 'reps' or 'hold'")
+    if rule["mode"] == "reps" and rule.get("joint") not in JOINT_INDEX:
+        raise ValueError(f"Rule {name!r}: unknown joint {rule.get('joint')!r}")
+    for constraint in [*rule.get("form", ()), *rule.get("detect", ())]:
+        feature = constraint.get("feature")
+        if feature not in _FEATURES:
+            raise ValueError(f"Rule {name!r}: unknown form feature {feature!r}")
+        if feature == "angle":
+            if constraint.get("joint") not in JOINT_INDEX:
+                raise ValueError(f"Rule {name!r}: unknown joint {constraint.get('joint')!r}")
+        elif len(constraint.get("points", ())) != _POINT_COUNTS[feature] or \
+                any(point not in LANDMARK_INDEX for point in constraint["points"]):
+            raise ValueError(f"Rule {name!r}: {feature} needs {_POINT_COUNTS[feature]} landmark names")
+
+
+class RuleEvaluator:
+    """
+    A set of rules compiled to index arrays over the landmark and joint angle arrays.
+    With detect=True the rules' detect constraints are evaluated in the same pass.
+    """
+    def __init__(self, rules, detect=False):
+        for name, rule in rules.items():
+            _check_rule(name, rule)
+        self.names = list(rules)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._joints = np.array([JOINT_INDEX.get(rule.get("joint"), 0) for rule in rules.values()], dtype=np.intp)
+        self._no_joint = np.array([rule["mode"] != "reps" for rule in rules.values()])
+
+        # Constraints grouped by feature, so each feature is one vectorized expression.
+        # Form constraints report to row i, detect constraints to row n + i.
+        count = len(self.names)
+        grouped = {feature: [] for feature in _FEATURES}
+        for i, rule in enumerate(rules.values()):
+            for constraint in rule.get("form", ()):
+                grouped[constraint["feature"]].append((i, constraint))
+            for constraint in rule.get("detect", ()) if detect else ():
+                grouped[constraint["feature"]].append((count + i, constraint))
+        self._groups = [] # (feature, slice of the value array, index arrays), only for features in use
+        rule_of, lower, upper = [], [], []
+        for feature in _FEATURES:
+            items = grouped[feature]
+            if not items:
+                continue
+            if feature == "angle":
+                points = np.array([JOINT_INDEX[c["joint"]] for _, c in items], dtype=np.intp)
+            else:
+                points = tuple(np.array([LANDMARK_INDEX[p] for p in column], dtype=np.intp)
+                               for column in zip(*(c["points"] for _, c in items)))
+            self._groups.append((feature, slice(len(rule_of), len(rule_of) + len(items)), points))
+            for i, constraint in items:
+                rule_of.append(i)
+                lower.append(constraint.get("min", -np.inf))
+                upper.append(constraint.get("max", np.inf))
+        self._rule_of = np.array(rule_of, dtype=np.intp)
+        self._lower = np.array(lower, dtype=np.float32)
+        self._upper = np.array(upper, dtype=np.float32)
+        self._allocate_outputs()
+
+    def _allocate_outputs(self):
+        count = len(self.names)
+        self._values = np.zeros(len(self._rule_of), dtype=np.float32)
+        self.main_angles = np.zeros(count, dtype=np.float32)
+        self._passed = np.zeros(2 * count, dtype=bool)
+        self.form_ok = self._passed[:count]
+        self.detected = self._passed[count:] # All True without detect constraints
+
+    def copy(self):
+        """Evaluator sharing this one's compiled index arrays, with its own output buffers."""
+        evaluator = copy.copy(self)
+        evaluator._allocate_outputs()
+        return evaluator
+
+    def evaluate(self, landmarks, angles):
+        """
+        Evaluates every rule on one frame. Returns (main angles, form_ok, detected), arrays
+        indexed like self.names (reused across calls). Hold rules have a main angle of 0.
+        The arrays belong to this evaluator, so one evaluator must not be shared between threads.
+        """
+        x = landmarks[:, X]
+        y = landmarks[:, Y]
+        values = self._values
+
+        for feature, group, points in self._groups:
+            if feature == "line_offset":
+                a, b, c = points
+                values[group] = np.abs(y[b] - (y[a] + y[c]) / 2)
+            elif feature == "height_diff":
+                a, b = points
+                values[group] = y[a] - y[b]
+            elif feature == "horizontal_dist":
+                a, b = points
+                values[group] = np.abs(x[a] - x[b])
+            elif feature == "incline":
+                a, b = points
+                values[group] = np.degrees(np.arctan2(np.abs(y[a] - y[b]), np.abs(x[a] - x[b])))
+            else:
+                values[group] = angles[points]
+
+        failed = self._rule_of[(values <= self._lower) | (values >= self._upper)]
+        np.equal(np.bincount(failed, minlength=len(self._passed)), 0, out=self._passed)
+        np.take(angles, self._joints, out=self.main_angles)
+        self.main_angles[self._no_joint] = 0.0
+        return self.main_angles, self.form_ok, self.detected
+
+
+@lru_cache(maxsize=None)
+def _compiled_rules(names, detect):
+    return RuleEvaluator({name: RULES[name] for name in names}, detect)
+
+
+def compile_rules(names=None, detect=False):
+    """
+    Returns a RuleEvaluator for a tuple of RULES names (all rules by default). Compilation is
+    cached; every call gets its own output buffers, so each tracker can evaluate on its own thread.
+    """
+    names = tuple(RULES) if names is None else names
+    return _compiled_rules(names, detect).copy()
+
+
+# --- State Machines ---
+class ExerciseState:
+    """Counter, message and rep log of one exercise, for running a rule outside a tracker."""
+    def __init__(self, rule):
+        self.counter = 0.0
+        self.form_ok = False
+        self.display_message = "Waiting to start..."
+        self.session_data = []
+        self.down_angle_threshold = rule.get("down")
+        self.up_angle_threshold = rule.get("up")
+        init_state(self, rule)
+
+
+def init_state(state, rule):
+    """Adds the state machine fields for `rule` to a tracker or ExerciseState."""
+    if rule["mode"] == "reps":
+        state.state = "waiting_down"
+        state.current_angle = 180.0
+        state.current_rep_min_angle = 180.0
+        state.rep_start_time = None
+    else:
+        state.current_angle = None
+        state.is_holding = False
+        state.hold_start_time = None
+        state.elapsed_time = 0.0
+
+
+def step_state(state, rule, main_angle, form_ok, now):
+    """Advances the rule's rep or hold state machine by one frame."""
+    if rule["mode"] == "reps":
+        _update_reps(state, rule, main_angle, form_ok, now)
+    else:
+        _update_hold(state, rule, form_ok, now)
+
+
+def _update_reps(state, rule, angle, form_ok, now):
+    messages = rule["messages"]
+    state.current_angle = angle
+    # Track minimum angle for form feedback
+    if state.state == "waiting_up":
+        state.current_rep_min_angle = min(state.current_rep_min_angle, angle)
+
+    if not form_ok and rule.get("form_gates_reps"):
+        state.display_message = messages["bad_form"]
+        return
+
+    if state.state == "waiting_down":
+        if angle < state.down_angle_threshold:
+            state.state = "waiting_up"
+            state.display_message = messages["down"]
+            state.rep_start_time = now
+        elif messages.get("waiting_down"):
+            state.display_message = messages["waiting_down"]
+
+    elif state.state == "waiting_up":
+        if angle > state.up_angle_threshold:
+            state.counter += 1
+            rep_duration = now - state.rep_start_time if state.rep_start_time else 0.0
+            state.state = "waiting_down"
+            state.display_message = messages["rep"]
+
+            # Store data after successful rep
+            state.session_data.append({
+                "rep": int(state.counter),
+                "form_ok": form_ok,
+                "min_angle": state.current_rep_min_angle,
+                "duration": rep_duration
+            })
+            state.current_rep_min_angle = 180.0 # Reset min angle for next rep
+            state.rep_start_time = None
+        elif messages.get("waiting_up"):
+            state.display_message = messages["waiting_up"]
+
+
+def _update_hold(state, rule, form_ok, now):
+    messages = rule["messages"]
+    if form_ok:
+        if not state.is_holding:
+            # Start new hold, continuing from the time held so far
+            state.is_holding = True
+            state.hold_start_time = now - state.elapsed_time
+            state.display_message = messages["start"]
+        else:
+            state.counter = now - state.hold_start_time
+            state.display_message = messages["holding"].format(seconds=int(state.counter))
+
+    else:
+        if state.is_holding:
+            # Form broken - stop holding, update final count
+            state.elapsed_time = state.counter
+            state.session_data.append({"time_held": state.elapsed_time, "form_ok": False})
+
+        state.is_holding = False
+        state.hold_start_time = None
+        state.display_message = messages["bad_form"]
+        state.counter = state.elapsed_time # Keep displaying the total time held so far
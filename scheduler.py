@@ -0,0 +1,192 @@
+import math
+
+import cv2
+import numpy as np
+
+from landmarks import VIS, new_landmark_array
+
+
+class InferenceScheduler:
+    """
+    Keeps pose inference inside a per-frame latency budget.
+
+    While inference is cheaper than the budget, pose runs on every frame. Once it is
+    not, pose runs on every Nth frame and the frames in between get landmarks
+    extrapolated from the last two detections, so rep counting and the overlay
+    still update on every frame.
+    """
+    def __init__(self, budget_ms, max_stride=4, smoothing=0.2, recover_ratio=0.8):
+        self.budget = budget_ms / 1000.0
+        self.max_stride = max_stride
+        self.smoothing = smoothing
+        # Only step the stride down once inference fits the budget with some headroom
+        self.recover_ratio = recover_ratio
+
+        self.stride = 1
+        self.avg_latency = 0.0
+        self.frames_since_inference = 0
+
+        self.prev = new_landmark_array()
+        self.last = new_landmark_array()
+        self.prev_time = None
+        self.last_time = None
+
+    def should_infer(self):
+        """True when the current frame should run pose inference."""
+        return self.frames_since_inference + 1 >= self.stride
+
+    def record(self, landmarks, timestamp, latency):
+        """Stores the result of an inference run and adapts the stride to its latency."""
+        self.frames_since_inference = 0
+        if self.avg_latency == 0.0:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.smoothing * (latency - self.avg_latency)
+
+        # Average cost per frame is latency / stride
+        needed = max(1, min(self.max_stride, math.ceil(self.avg_latency / self.budget)))
+        if needed > self.stride:
+            self.stride = needed
+        elif self.stride > 1 and self.avg_latency / (self.stride - 1) < self.budget * self.recover_ratio:
+            self.stride -= 1
+
+        if landmarks is None:
+            # Detection lost, do not extrapolate across the gap
+            self.prev_time = None
+            self.last_time = None
+            return
+
+        self.prev, self.last = self.last, self.prev
+        self.prev_time = self.last_time
+        self.last[:] = landmarks
+        self.last_time = timestamp
+
+    def predict(self, timestamp, out):
+        """
+        Writes landmarks for a skipped frame into `out`, extrapolating linearly from the
+        last two detections. Returns None if there is no detection to predict from.
+        """
+        self.frames_since_inference += 1
+        if self.last_time is None:
+            return None
+
+        out[:] = self.last
+        if self.prev_time is None or self.last_time <= self.prev_time:
+            return out
+
+        # Never extrapolate further ahead than one inference interval
+        interval = self.last_time - self.prev_time
+        step = min(timestamp - self.last_time, interval) / interval
+        out[:, :VIS] += (self.last[:, :VIS] - self.prev[:, :VIS]) * np.float32(step)
+        return out
+
+
+class MotionGate:
+    """
+    Skips pose inference while the picture is not changing (e.g. a plank hold).
+
+    Each frame is reduced to a small grayscale thumbnail and compared with the thumbnail
+    of the last frame that ran inference. While the mean difference stays under the
+    threshold the last landmarks are reused, with a forced refresh every
+    `refresh_frames` frames.
+    """
+    def __init__(self, threshold=2.5, refresh_frames=30, thumb_size=(64, 48)):
+        self.threshold = threshold
+        self.refresh_frames = refresh_frames
+        self.thumb_size = thumb_size
+
+        self.current = None
+        self.reference = None
+        self.landmarks = new_landmark_array()
+        self.has_landmarks = False
+        self.frames_since_refresh = 0
+
+    def is_static(self, frame):
+        """True when the frame is close enough to the reference to reuse its landmarks."""
+        thumb = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_NEAREST)
+        self.current = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        if not self.has_landmarks or self.frames_since_refresh >= self.refresh_frames:
+            return False
+
+        if cv2.absdiff(self.current, self.reference).mean() >= self.threshold:
+            return False
+        self.frames_since_refresh += 1
+        return True
+
+    def refresh(self, landmarks):
+        """Makes the current frame and its inference result the new reference."""
+        self.reference = self.current
+        self.frames_since_refresh = 0
+        self.has_landmarks = landmarks is not None
+        if self.has_landmarks:
+            self.landmarks[:] = landmarks
+
+
+class ComplexityGovernor:
+    """
+    Picks the pose model complexity from the measured inference time. The camera's frame
+    rate is not used: a 12 fps webcam on an idle host is not an overload.
+
+    Steps down once the host has been overloaded for `hold_seconds`, steps back up only
+    after `recover_seconds` of clear headroom, and never switches twice within
+    `cooldown_seconds`, so the model does not flap between levels.
+    """
+    # Rough inference cost of each complexity relative to the level below it
+    STEP_COST = {1: 2.0, 2: 3.0}
+
+    def __init__(self, complexity=1, min_complexity=0, max_complexity=1, target_fps=15.0,
+                 hold_seconds=2.0, recover_seconds=10.0, cooldown_seconds=5.0, smoothing=0.1):
+        self.complexity = complexity
+        self.min_complexity = min_complexity
+        self.max_complexity = max_complexity
+        self.target_fps = target_fps
+        self.hold_seconds = hold_seconds
+        self.recover_seconds = recover_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.smoothing = smoothing
+
+        self.avg_latency = 0.0
+        self.overloaded_since = None
+        self.headroom_since = None
+        self.last_switch = None
+        self.unavailable = set()
+
+    def observe(self, latency, now):
+        """Feeds one inference measurement. Returns the complexity to switch to, or None."""
+        if self.avg_latency == 0.0:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.smoothing * (latency - self.avg_latency)
+
+        budget = 1.0 / self.target_fps
+        overloaded = self.avg_latency > budget
+        step_up = self.complexity + 1
+        headroom = (
+            step_up <= self.max_complexity and step_up not in self.unavailable
+            and self.avg_latency * self.STEP_COST.get(step_up, 1.0) < budget * 0.7
+        )
+
+        self.overloaded_since = (self.overloaded_since or now) if overloaded else None
+        self.headroom_since = (self.headroom_since or now) if headroom else None
+        if self.last_switch is not None and now - self.last_switch < self.cooldown_seconds:
+            return None
+
+        if overloaded and self.complexity > self.min_complexity and now - self.overloaded_since >= self.hold_seconds:
+            target = self.complexity - 1
+        elif headroom and now - self.headroom_since >= self.recover_seconds:
+            target = step_up
+        else:
+            return None
+
+        self.complexity = target
+        self.last_switch = now
+        self.overloaded_since = None
+        self.headroom_since = None
+        # The average belongs to the old model
+        self.avg_latency = 0.0
+        return target
+
+    def mark_unavailable(self, complexity, fallback):
+        """Records that a level could not be loaded (e.g. model download failed) and stays on `fallback`."""
+        self.unavailable.add(complexity)
+        self.complexity = fallback
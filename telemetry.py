@@ -0,0 +1,67 @@
+"""
+Per-frame session telemetry in a fixed-size ring buffer.
+
+session_data only records finished reps and broken holds. The telemetry buffer keeps
+one row per analysed frame (time since session start, main angle, form_ok, mean
+landmark visibility) in a preallocated float32 array. Memory stays constant however
+long the session runs: once the buffer is full the oldest frames are overwritten.
+downsample() reduces a recording to a few hundred buckets for charting.
+"""
+import numpy as np
+
+TIME, ANGLE, FORM_OK, VISIBILITY = 0, 1, 2, 3
+FIELDS = ("time", "angle", "form_ok", "visibility")
+
+
+class TelemetryBuffer:
+    """Preallocated ring of (time, angle, form_ok, visibility) rows."""
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self._rows = np.zeros((capacity, len(FIELDS)), dtype=np.float32)
+        self._next = 0
+        self.total = 0 # Frames recorded, including overwritten ones
+
+    def append(self, timestamp, angle, form_ok, visibility):
+        """Records one frame; angle is NaN for frames without a detected body."""
+        self._rows[self._next] = (timestamp, angle, form_ok, visibility)
+        self._next = (self._next + 1) % self.capacity
+        # Counted only once the row is written, so readers never see a half-written row as recorded
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def to_array(self, end=None):
+        """
+        Returns the buffered rows up to frame `end` (all recorded frames by default) in time
+        order, as a copy. Safe while one other thread appends: rows that may have been
+        overwritten during the copy are left out.
+        """
+        end = self.total if end is None else end
+        start = max(0, end - self.capacity)
+        rows = self._rows[np.arange(start, end) % self.capacity]
+        # Frames before this one are overwritten, or being overwritten by the append in progress
+        overwritten = self.total + 1 - self.capacity
+        if overwritten > start:
+            rows = rows[overwritten - start:]
+        return rows
+
+
+def downsample(rows, max_points=500):
+    """
+    Reduces telemetry rows to at most `max_points` buckets of consecutive frames.
+    Returns a dict of arrays: time and the form_ok/visibility means per bucket, plus the
+    angle's min and max so reps stay visible as peaks. NaN angles (no body) are ignored.
+    """
+    count = len(rows)
+    if count == 0:
+        return {key: np.zeros(0, dtype=np.float32) for key in ("time", "angle_min", "angle_max", "form_ok", "visibility")}
+    starts = np.linspace(0, count, min(count, max_points), endpoint=False).astype(np.intp)
+    sizes = np.diff(np.append(starts, count))
+    return {
+        "time": rows[starts, TIME],
+        "angle_min": np.fmin.reduceat(rows[:, ANGLE], starts),
+        "angle_max": np.fmax.reduceat(rows[:, ANGLE], starts),
+        "form_ok": np.add.reduceat(rows[:, FORM_OK], starts) / sizes,
+        "visibility": np.add.reduceat(rows[:, VISIBILITY], starts) / sizes,
+    }
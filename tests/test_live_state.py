@@ -0,0 +1,52 @@
+"""
+Landmarks-only state endpoint: only the app's own pages may read a session's state.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_state
+
+APP_PORT = 8501
+
+
+class StateEndpointTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Port 0: any free port, read back from the server
+        assert live_state.serve_state(0, APP_PORT)
+        cls.port = live_state._endpoint.server.server_address[1]
+        live_state.publish("key", {"counter": 3})
+
+    @classmethod
+    def tearDownClass(cls):
+        live_state.discard("key")
+
+    def get(self, origin=None):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.port}/state/key")
+        if origin is not None:
+            request.add_header("Origin", origin)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status, response.headers.get("Access-Control-Allow-Origin")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def test_binds_to_localhost(self):
+        self.assertEqual(live_state._endpoint.server.server_address[0], "127.0.0.1")
+
+    def test_cors_is_limited_to_the_app_origin(self):
+        self.assertEqual(self.get(f"http://127.0.0.1:{APP_PORT}"), (200, f"http://127.0.0.1:{APP_PORT}"))
+        self.assertEqual(self.get(), (200, None))
+        self.assertEqual(self.get("http://evil.example"), (403, None))
+        self.assertEqual(self.get(f"http://127.0.0.1:{APP_PORT + 1}"), (403, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+Pose graph pool: idle graphs must be closed once they expire, even when no new
+session starts to trigger the eviction.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pose_models import PoseInstancePool
+
+
+class PoseInstancePoolTest(unittest.TestCase):
+    def test_idle_graphs_expire_without_checkout(self):
+        pool = PoseInstancePool(idle_timeout=0.5)
+        try:
+            pose = pool.checkout()
+            pool.checkin(pose)
+            self.assertEqual(sum(len(idle) for idle in pool._idle.values()), 1)
+            deadline = time.monotonic() + 5.0
+            while any(pool._idle.values()) and time.monotonic() < deadline:
+                time.sleep(0.1)
+            self.assertFalse(any(pool._idle.values()))
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
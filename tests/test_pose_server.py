@@ -0,0 +1,102 @@
+"""
+Pose worker pool fault handling: a bad request or a dead worker must not leave the
+sessions pinned to that worker without results.
+
+    python -m pytest tests
+"""
+import os
+import signal
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from landmarks import new_landmark_array
+from pose_server import PosePool
+
+BLANK = np.zeros((64, 64, 3), dtype=np.uint8)
+
+
+def wait_until_answering(client, timeout=60.0):
+    """Waits until the session's worker answers frames without timing out."""
+    out = new_landmark_array()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        client.process(BLANK, out, timeout=5.0)
+        if time.monotonic() - started < 1.0:
+            return True
+    return False
+
+
+class PosePoolFaultTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = PosePool(workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def test_bad_request_does_not_stop_worker(self):
+        client = self.pool.open_session()
+        try:
+            self.assertTrue(wait_until_answering(client))
+            # Unknown session: raised KeyError and killed the worker loop before
+            self.pool.requests(client.worker).put(("configure", -1, 0, {}))
+            self.assertTrue(wait_until_answering(client, timeout=10.0))
+            self.assertTrue(self.pool._processes[client.worker].is_alive())
+        finally:
+            client.close()
+
+    def test_failed_configure_is_reported(self):
+        client = self.pool.open_session()
+        try:
+            self.assertTrue(wait_until_answering(client))
+            # Fails to build in the worker, as a model that can't be downloaded would
+            self.assertFalse(client.configure(unknown_option=True))
+            self.assertNotIn("unknown_option", client.pose_options)
+            self.assertTrue(wait_until_answering(client, timeout=10.0))
+        finally:
+            client.close()
+
+    @unittest.skipUnless(hasattr(signal, "SIGSTOP"), "needs SIGSTOP")
+    def test_timed_out_slot_is_not_reused(self):
+        client = self.pool.open_session()
+        out = new_landmark_array()
+        process = self.pool._processes[client.worker]
+        try:
+            self.assertTrue(wait_until_answering(client))
+            os.kill(process.pid, signal.SIGSTOP)
+            try:
+                tickets = [client.submit(BLANK) for _ in range(client._ring.slots)]
+                for ticket in tickets:
+                    self.assertIsNone(client.fetch(ticket, out, timeout=0.2))
+                # Every slot still belongs to a frame the stopped worker has not read
+                slot, future = client.submit(BLANK)
+                self.assertIsNone(future)
+            finally:
+                os.kill(process.pid, signal.SIGCONT)
+            self.assertTrue(wait_until_answering(client, timeout=10.0))
+            self.assertIs(self.pool._processes[client.worker], process)
+        finally:
+            client.close()
+
+    def test_dead_worker_is_restarted(self):
+        client = self.pool.open_session()
+        try:
+            self.assertTrue(wait_until_answering(client))
+            process = self.pool._processes[client.worker]
+            process.kill()
+            process.join(5)
+            self.assertTrue(wait_until_answering(client))
+            self.assertIsNot(self.pool._processes[client.worker], process)
+        finally:
+            client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Rule engine regressions: the rule-driven trackers must reproduce the hand-written
+Push-up, Squat and Plank trackers they replaced, and trackers must not share the
+evaluator's output buffers.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import FPS, synthetic_landmarks
+from landmarks import JOINT_INDEX, LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, joint_angles
+from rules import RULES, compile_rules
+from trackers import TRACKER_MAPPING, AutoTracker, ManualClock
+
+
+# --- Reference Trackers (the hand-written logic before rules.py) ---
+class ReferenceState:
+    def __init__(self, exercise, clock):
+        self.clock = clock
+        self.down_angle_threshold = RULES[exercise]["down"]
+        self.up_angle_threshold = RULES[exercise]["up"]
+        self.counter = 0.0
+        self.display_message = "Waiting to start..."
+        self.session_data = []
+        self.state = "waiting_down"
+        self.current_rep_min_angle = 180.0
+        self.rep_start_time = None
+        self.is_holding = False
+        self.hold_start_time = None
+        self.elapsed_time = 0.0
+
+
+def _finish_rep(ref, form_ok):
+    ref.counter += 1
+    rep_duration = ref.clock() - ref.rep_start_time if ref.rep_start_time else 0.0
+    ref.state = "waiting_down"
+    ref.display_message = "Nice Rep!"
+    ref.session_data.append({
+        "rep": int(ref.counter), "form_ok": form_ok,
+        "min_angle": ref.current_rep_min_angle, "duration": rep_duration,
+    })
+    ref.current_rep_min_angle = 180.0
+    ref.rep_start_time = None
+
+
+def reference_pushup(ref, landmarks, angles):
+    angle = float(angles[JOINT_INDEX["left_elbow"]])
+    mid_y = (landmarks[LEFT_SHOULDER, 1] + landmarks[LEFT_ANKLE, 1]) / 2
+    form_ok = bool(abs(landmarks[LEFT_HIP, 1] - mid_y) < 0.15)
+    if ref.state == "waiting_up":
+        ref.current_rep_min_angle = min(ref.current_rep_min_angle, angle)
+    if not form_ok:
+        ref.display_message = "Adjust Form! (Hips/Back)"
+    elif ref.state == "waiting_down":
+        if angle < ref.down_angle_threshold:
+            ref.state = "waiting_up"
+            ref.display_message = "Down! Now Push Up"
+            ref.rep_start_time = ref.clock()
+    elif angle > ref.up_angle_threshold:
+        _finish_rep(ref, form_ok)
+    else:
+        ref.display_message = "Extend Arms Fully"
+
+
+def reference_squat(ref, landmarks, angles):
+    angle = float(angles[JOINT_INDEX["left_knee"]])
+    form_ok = bool(landmarks[LEFT_HIP, 1] < landmarks[LEFT_KNEE, 1])
+    if ref.state == "waiting_up":
+        ref.current_rep_min_angle = min(ref.current_rep_min_angle, angle)
+    if ref.state == "waiting_down":
+        if angle < ref.down_angle_threshold:
+            ref.state = "waiting_up"
+            ref.display_message = "Deep Squat! Push Up"
+            ref.rep_start_time = ref.clock()
+        else:
+            ref.display_message = "Squat Deeper (Knee Angle)"
+    elif angle > ref.up_angle_threshold:
+        _finish_rep(ref, form_ok)
+    else:
+        ref.display_message = "Stand Up Fully"
+
+
+def reference_plank(ref, landmarks, angles):
+    mid_y = (landmarks[LEFT_SHOULDER, 1] + landmarks[LEFT_ANKLE, 1]) / 2
+    form_ok = bool(abs(landmarks[LEFT_HIP, 1] - mid_y) < 0.05)
+    now = ref.clock()
+    if form_ok:
+        if not ref.is_holding:
+            ref.is_holding = True
+            ref.hold_start_time = now - ref.elapsed_time
+            ref.display_message = "Form OK! HOLD"
+        else:
+            ref.counter = now - ref.hold_start_time
+            ref.display_message = f"HOLDING: {int(ref.counter)}s"
+    else:
+        if ref.is_holding:
+            ref.elapsed_time = ref.counter
+            ref.session_data.append({"time_held": ref.elapsed_time, "form_ok": False})
+        ref.is_holding = False
+        ref.hold_start_time = None
+        ref.display_message = "BAD FORM! Adjust Hips/Back"
+        ref.counter = ref.elapsed_time
+
+
+REFERENCES = {"Push-up": reference_pushup, "Squat": reference_squat, "Plank": reference_plank}
+
+
+def noisy_sequence(exercise, frames=3000):
+    """Synthetic landmarks with jittered hips, so form checks fail now and then."""
+    landmarks = synthetic_landmarks(exercise, frames, seed=3)
+    rng = np.random.default_rng(1)
+    landmarks[:, LEFT_HIP, 1] += rng.normal(0, 0.05, frames).astype(np.float32)
+    return landmarks
+
+
+class RuleTrackerEquivalenceTest(unittest.TestCase):
+    def test_matches_reference_trackers(self):
+        for exercise, reference in REFERENCES.items():
+            with self.subTest(exercise=exercise):
+                clock = ManualClock()
+                tracker = TRACKER_MAPPING[exercise](session_start_time=0.0, clock=clock, pose_estimation=False)
+                ref = ReferenceState(exercise, clock)
+                angles = np.zeros(len(JOINT_INDEX), dtype=np.float32)
+                try:
+                    for i, landmarks in enumerate(noisy_sequence(exercise)):
+                        clock.now = i / FPS
+                        tracker.score(landmarks)
+                        reference(ref, landmarks, joint_angles(landmarks, angles))
+                        self.assertEqual(tracker.display_message, ref.display_message, f"frame {i}")
+                        self.assertAlmostEqual(tracker.counter, ref.counter, places=6, msg=f"frame {i}")
+                    self.assertGreater(len(ref.session_data), 0)
+                    self.assertEqual(len(tracker.session_data), len(ref.session_data))
+                    for entry, expected in zip(tracker.session_data, ref.session_data):
+                        self.assertEqual(entry.keys(), expected.keys())
+                        for key, value in expected.items():
+                            self.assertAlmostEqual(entry[key], value, places=4)
+                finally:
+                    tracker.close()
+
+
+class EvaluatorBuffersTest(unittest.TestCase):
+    def test_evaluators_do_not_share_outputs(self):
+        first = compile_rules(("Push-up",))
+        second = compile_rules(("Push-up",))
+        down, up = synthetic_landmarks("Push-up", 45)[[22, 0]]
+        angles = np.zeros(len(JOINT_INDEX), dtype=np.float32)
+        main_angles, form_ok, _ = first.evaluate(down, joint_angles(down, angles))
+        expected = main_angles.copy(), form_ok.copy()
+        second.evaluate(up, joint_angles(up, angles))
+        np.testing.assert_array_equal(main_angles, expected[0])
+        np.testing.assert_array_equal(form_ok, expected[1])
+        self.assertNotEqual(float(main_angles[0]), float(second.main_angles[0]))
+
+    def test_concurrent_auto_trackers_lock_onto_their_own_exercise(self):
+        # Interleaves two sessions between calculate_metrics and update_state, like two worker threads
+        clock = ManualClock()
+        trackers = {exercise: AutoTracker(0.0, clock, pose_estimation=False) for exercise in ("Push-up", "Squat")}
+        sequences = {exercise: synthetic_landmarks(exercise, 300) for exercise in trackers}
+        angles = {exercise: np.zeros(len(JOINT_INDEX), dtype=np.float32) for exercise in trackers}
+        try:
+            for i in range(300):
+                clock.now = i / FPS
+                for exercise, tracker in trackers.items():
+                    landmarks = sequences[exercise][i]
+                    tracker.form_ok = tracker.calculate_metrics(landmarks, joint_angles(landmarks, angles[exercise]))[1]
+                for exercise, tracker in trackers.items():
+                    tracker.update_state(0.0, tracker.form_ok)
+            for exercise, tracker in trackers.items():
+                self.assertEqual(tracker.exercise, exercise)
+        finally:
+            for tracker in trackers.values():
+                tracker.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
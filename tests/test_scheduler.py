@@ -0,0 +1,39 @@
+"""
+ComplexityGovernor regressions.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import ComplexityGovernor
+
+
+def run_governor(governor, latency, seconds, camera_fps):
+    """Feeds one inference per camera frame; returns the complexity at the end."""
+    for frame in range(int(seconds * camera_fps)):
+        complexity = governor.observe(latency, frame / camera_fps)
+        if complexity is not None:
+            governor.complexity = complexity
+    return governor.complexity
+
+
+class ComplexityGovernorTest(unittest.TestCase):
+    def test_slow_camera_on_idle_host_keeps_complexity(self):
+        governor = ComplexityGovernor(complexity=1, max_complexity=1, target_fps=15.0)
+        self.assertEqual(run_governor(governor, latency=0.010, seconds=30, camera_fps=12), 1)
+
+    def test_slow_inference_steps_down(self):
+        governor = ComplexityGovernor(complexity=1, max_complexity=1, target_fps=15.0)
+        self.assertEqual(run_governor(governor, latency=0.100, seconds=5, camera_fps=12), 0)
+
+    def test_headroom_steps_back_up(self):
+        governor = ComplexityGovernor(complexity=0, max_complexity=1, target_fps=15.0)
+        self.assertEqual(run_governor(governor, latency=0.010, seconds=15, camera_fps=12), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
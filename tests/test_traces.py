@@ -0,0 +1,55 @@
+"""
+Trace replay: recorded landmarks re-scored with threshold overrides, for fixed
+exercises and for Auto sessions that lock on during the replay.
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import FPS, synthetic_landmarks
+from config import AUTO_EXERCISE
+from traces import TraceWriter, replay
+
+
+class TraceReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_trace(self, header_exercise, exercise, frames=450):
+        path = os.path.join(self.directory, f"{header_exercise}_{exercise}.pctrace")
+        writer = TraceWriter(path, header_exercise, 0.0)
+        for i, landmarks in enumerate(synthetic_landmarks(exercise, frames)):
+            writer.write(i / FPS, landmarks)
+        writer.close()
+        return path
+
+    def test_threshold_overrides(self):
+        # The synthetic reps bottom out at 50 (elbow) and 80 (knee) degrees
+        # Not an Auto push-up: with no reps counted, its straight-body frames lock onto Plank
+        for header_exercise, exercise in (("Push-up", "Push-up"), (AUTO_EXERCISE, "Squat")):
+            with self.subTest(trace=header_exercise, exercise=exercise):
+                path = self.write_trace(header_exercise, exercise)
+                tracker = replay(path)
+                try:
+                    self.assertEqual(tracker.exercise, exercise)
+                    self.assertGreater(tracker.counter, 0)
+                finally:
+                    tracker.close()
+                tracker = replay(path, {"down": 40.0})
+                try:
+                    self.assertEqual(tracker.counter, 0)
+                finally:
+                    tracker.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""
+Inference worker: a frame whose analysis raises is counted and reported, and the
+worker keeps serving the last good result.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker import InferenceWorker
+
+
+class InferenceWorkerTest(unittest.TestCase):
+    def test_failed_frames_are_counted(self):
+        def analyze(frame):
+            if frame == "bad":
+                raise ValueError("bad frame")
+            return np.zeros((33, 4), dtype=np.float32), None
+
+        failures = []
+        worker = InferenceWorker(analyze, on_error=failures.append)
+        try:
+            worker.submit("good")
+            deadline = time.monotonic() + 5.0
+            while worker.latest()[0] is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            for count in range(1, 4):
+                # One at a time: the queue would replace a frame submitted while the worker is busy
+                worker.submit("bad")
+                while worker.errors < count and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            self.assertEqual(worker.errors, 3)
+            self.assertEqual(len(failures), 3)
+            self.assertIsNotNone(worker.latest()[0])
+        finally:
+            self.assertTrue(worker.stop())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Landmark traces: compact per-frame recordings of a session, and fast re-scoring.
+
+A trace file is a small JSON header followed by fixed-stride float32 records:
+
+    [time since session start, detected flag, 33 x (x, y, z, visibility)]
+
+so a whole trace can be memory-mapped as one (frames, 134) array. Replaying a trace
+feeds the recorded landmarks through the tracker state machines without video or
+MediaPipe, which makes re-scoring with new CONFIG thresholds very fast.
+
+    python traces.py --down 65 --out rescored.csv traces/Push-up_*.pctrace
+"""
+import argparse
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from landmarks import NUM_LANDMARKS
+
+MAGIC = b"PCTRACE1"
+RECORD_FLOATS = 2 + NUM_LANDMARKS * 4
+HEADER_ALIGN = 64
+
+
+class TraceWriter:
+    """Appends one record per analysed frame to a trace file."""
+    def __init__(self, path, exercise, session_start_time):
+        header = json.dumps({
+            "exercise": exercise,
+            "session_start_time": session_start_time,
+            "record_floats": RECORD_FLOATS,
+        }).encode()
+        # Pad so the records start on an aligned offset for memory mapping
+        data_offset = -(-(len(MAGIC) + 4 + len(header)) // HEADER_ALIGN) * HEADER_ALIGN
+        header = header.ljust(data_offset - len(MAGIC) - 4)
+
+        self.path = path
+        self.session_start_time = session_start_time
+        self.frames = 0
+        self._record = np.zeros(RECORD_FLOATS, dtype=np.float32)
+        self._file = open(path, "wb", buffering=1 << 16)
+        self._file.write(MAGIC + struct.pack("<I", len(header)) + header)
+
+    def write(self, timestamp, landmarks):
+        """Records a frame's landmarks, or None when no body was detected."""
+        record = self._record
+        record[0] = timestamp - self.session_start_time
+        if landmarks is None:
+            record[1] = 0.0
+        else:
+            record[1] = 1.0
+            record[2:] = landmarks.ravel()
+        self._file.write(record)
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_trace(path):
+    """Returns (header dict, memory-mapped (frames, RECORD_FLOATS) float32 array)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a landmark trace: {path}")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    data_offset = len(MAGIC) + 4 + header_len
+    if os.path.getsize(path) == data_offset:
+        return header, np.zeros((0, RECORD_FLOATS), dtype=np.float32)
+    records = np.memmap(path, dtype=np.float32, mode="r", offset=data_offset)
+    return header, records.reshape(-1, header["record_floats"])
+
+
+def replay(path, thresholds=None):
+    """
+    Feeds a trace through its exercise's tracker and returns the tracker.
+    `thresholds` overrides the CONFIG angles, e.g. {"down": 65.0, "up": 165.0}.
+    """
+    from trackers import ManualClock, tracker_class
+
+    header, records = read_trace(path)
+    clock = ManualClock()
+    tracker = tracker_class(header["exercise"])(session_start_time=0.0, clock=clock, pose_estimation=False)
+    thresholds = thresholds or {}
+    tracker.set_thresholds(thresholds.get("down"), thresholds.get("up"))
+
+    landmarks = records[:, 2:].reshape(-1, NUM_LANDMARKS, 4)
+    for timestamp, detected, frame_landmarks in zip(records[:, 0].tolist(), records[:, 1].tolist(), landmarks):
+        clock.now = timestamp
+        if detected:
+            tracker.score(frame_landmarks)
+    return tracker
+
+
+def rescore(path, thresholds=None):
+    """Replays one trace and returns its results in the batch result format."""
+    tracker = replay(path, thresholds)
+    for entry in tracker.session_data:
+        entry["file"] = os.path.basename(path)
+    return {"exercise": tracker.exercise, "final_count": tracker.counter, "rep_data": tracker.session_data}
+
+
+def main(argv=None):
+    from batch import write_results
+
+    parser = argparse.ArgumentParser(description="Re-score recorded landmark traces with new thresholds.")
+    parser.add_argument("traces", nargs="+", help="Trace files to replay.")
+    parser.add_argument("--down", type=float, help="Override the 'down' angle threshold.")
+    parser.add_argument("--up", type=float, help="Override the 'up' angle threshold.")
+    parser.add_argument("--out", default="rescored.json", help="Output file (.json, .csv or .parquet).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    args = parser.parse_args(argv)
+
+    thresholds = {key: value for key, value in (("down", args.down), ("up", args.up)) if value is not None}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = dict(zip(args.traces, pool.map(rescore, args.traces, [thresholds] * len(args.traces), chunksize=16)))
+    write_results(results, args.out)
+    for path, result in results.items():
+        print(f"{path}: {result['final_count']:.1f} ({result['exercise']})")
+
+
+if __name__ == "__main__":
+    main()
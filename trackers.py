@@ -0,0 +1,618 @@
+from streamlit_webrtc import VideoTransformerBase
+import cv2
+import mediapipe as mp
+from mediapipe.framework.formats import landmark_pb2
+import numpy as np
+import os
+import time
+import uuid
+from collections import namedtuple
+
+from export import VideoExporter, write_rows
+from landmarks import JOINTS, joint_angles, landmark_roi, landmarks_to_array, new_landmark_array, uncrop_landmarks
+import live_state
+import metrics
+from overlay import OverlayCompositor
+from pose_models import DEFAULT_POSE_OPTIONS, get_pose_instances
+from pose_server import get_pose_pool
+from config import AUTO_EXERCISE, CONFIG, PIPELINE, format_time
+from rules import RULES, ExerciseState, compile_rules, init_state, step_state
+from scheduler import ComplexityGovernor, InferenceScheduler, MotionGate
+from telemetry import TelemetryBuffer
+from traces import TraceWriter
+from worker import InferenceWorker
+
+# --- Helper Functions ---
+class ManualClock:
+    """Clock that reports an externally set time: the video or trace timestamp being analysed."""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+def to_landmark_list(landmarks):
+    """Builds a NormalizedLandmarkList from a landmark array, for drawing predicted frames."""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list
+
+# --- Live State Snapshot ---
+# Immutable copy of the tracker state, replaced after every analysed frame by the thread that
+# runs the exercise logic. Readers (the Streamlit page, save_session_data, the landmarks-only
+# publisher) take the current reference and get a consistent view without locking the video thread.
+TrackerSnapshot = namedtuple("TrackerSnapshot", [
+    "version", # Increments with every publish, so pollers can skip unchanged state
+    "exercise", "counter", "elapsed", "form_ok", "message", "angle",
+    "frames", "form_ok_frames", # Frames with a detected body, and those with OK form
+    "reps", # Tuple of the session_data entries (finished reps or broken holds)
+    "telemetry_total", # Telemetry rows recorded up to this snapshot (see TelemetryBuffer.to_array)
+    "errors", # Frames whose analysis raised on the inference worker
+])
+
+
+# --- Base Exercise Tracking Class ---
+class BaseExerciseTracker(VideoTransformerBase):
+    def __init__(self, exercise_name, down_angle, up_angle, session_start_time=None, clock=None, **options):
+        # The page can pick the session key, so it knows where to find the published state
+        self.session_id = options.pop("session_id", None) or uuid.uuid4().hex[:8]
+        self.options = {**PIPELINE, **options}
+        self.mp_pose = mp.solutions.pose
+        # Either a warm local Pose graph from the instance pool or a session in the process pool.
+        # Both are handed back by close().
+        self.remote_pose = bool(self.options["pose_workers"])
+        self.pose_options = dict(DEFAULT_POSE_OPTIONS)
+        if not self.options["pose_estimation"]:
+            self.pose = None
+        elif self.remote_pose:
+            self.pose = get_pose_pool(self.options["pose_workers"]).open_session(**self.pose_options)
+        else:
+            self.pose = get_pose_instances().checkout(**self.pose_options)
+        self.drawer = mp.solutions.drawing_utils
+        self.styles = mp.solutions.drawing_styles
+        self.overlay = OverlayCompositor()
+        # Per-frame buffers, reused so the hot path does not allocate
+        self.landmarks = new_landmark_array()
+        self.angles = np.zeros(len(JOINTS), dtype=np.float32)
+        self.roi = None # Pixel box (x0, y0, x1, y1) for the next inference, None means full frame
+
+        # Clock used for rep durations, hold times and session time.
+        # Live sessions use wall time; offline analysis passes the video clock.
+        self.clock = clock or time.time
+
+        budget = self.options["latency_budget_ms"]
+        self.scheduler = InferenceScheduler(budget, self.options["max_frame_stride"]) if budget else None
+        self.governor = None
+        if self.options["adaptive_complexity"]:
+            self.governor = ComplexityGovernor(
+                self.pose_options["model_complexity"], max_complexity=self.options["max_model_complexity"],
+                target_fps=self.options["target_fps"],
+            )
+        self.motion_gate = None
+        if self.options["motion_gate"]:
+            self.motion_gate = MotionGate(self.options["motion_threshold"], self.options["motion_refresh_frames"])
+
+        self.exercise = exercise_name
+        self.timings = metrics.StageTimings(f"{exercise_name}-{self.session_id}")
+        metrics.register(self.timings)
+        self.down_angle_threshold = down_angle
+        self.up_angle_threshold = up_angle
+        self.counter = 0.0 # Use float for plank time
+        self.form_ok = False
+        self.display_message = "Waiting to start..."
+        self.session_data = [] # List to store data after each rep
+        self.telemetry = TelemetryBuffer(self.options["telemetry_frames"])
+        self.frames_scored = 0
+        self.form_ok_frames = 0
+        self.frames_inferred = 0 # Frames that went through the pose model (not reused or predicted)
+        self.analysis_errors = 0
+
+        self.start_time = time.time()
+        self.frame_count = 0
+        self.fps = 0
+        # Session start time is passed in by the caller (Streamlit state or batch runner)
+        self.session_start_time = session_start_time if session_start_time is not None else self.clock()
+
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.session_start_time))
+        session_name = f"{self.exercise}_{started}_{self.session_id}"
+        self.trace = None
+        if self.options["trace_dir"]:
+            os.makedirs(self.options["trace_dir"], exist_ok=True)
+            name = f"{session_name}.pctrace"
+            self.trace = TraceWriter(os.path.join(self.options["trace_dir"], name), self.exercise, self.session_start_time)
+
+        # Output video is encoded on the exporter's thread; rep_data is written by close()
+        self.exporter = None
+        self.export_path = None
+        if self.options["export_dir"]:
+            os.makedirs(self.options["export_dir"], exist_ok=True)
+            self.export_path = os.path.join(self.options["export_dir"], session_name)
+            self.exporter = VideoExporter(self.export_path + ".mp4", self.options["export_fps"],
+                                          self.options["export_queue_frames"])
+
+        self.snapshot = None
+        self.publish_snapshot()
+        self.worker = None
+        if self.options["async_inference"]:
+            self.worker = InferenceWorker(self.analyze, on_error=self.analysis_failed)
+
+    def publish_snapshot(self):
+        """Replaces self.snapshot with the current state. A single reference swap, so readers never block."""
+        previous = self.snapshot
+        rows = self.session_data
+        # Entries are only ever appended, so the tuple is rebuilt only when one was added
+        if previous is not None and previous.reps and rows and previous.reps[-1] is rows[-1] and len(previous.reps) == len(rows):
+            reps = previous.reps
+        else:
+            reps = tuple(rows)
+        self.snapshot = TrackerSnapshot(
+            previous.version + 1 if previous is not None else 0,
+            self.exercise, self.counter, self.clock() - self.session_start_time, self.form_ok,
+            self.display_message, getattr(self, "current_angle", None),
+            self.frames_scored, self.form_ok_frames, reps, self.telemetry.total, self.analysis_errors,
+        )
+
+    def save_session_data(self, store):
+        """
+        Explicitly saves final data to the given store (e.g. Streamlit session state).
+        This is called reliably by the 'Stop Stream' button callback. It reads the latest
+        snapshot, so it never sees the video thread halfway through a frame.
+        """
+        snapshot = self.snapshot
+        store['rep_data'] = list(snapshot.reps)
+        store['final_count'] = snapshot.counter # Reps or total time held
+        # Calculate the total session time elapsed
+        store['final_time'] = self.clock() - self.session_start_time
+        store['exercise_type'] = snapshot.exercise
+        # Same handoff for the telemetry: rows up to the snapshot, copied without stopping the writer
+        store['telemetry'] = self.telemetry.to_array(snapshot.telemetry_total)
+        store['export_dropped_frames'] = self.exporter.dropped if self.exporter is not None else None
+
+    def calculate_metrics(self, landmarks, angles):
+        """
+        Placeholder method to be overridden by specific exercise logic.
+        `landmarks` is the (33, 4) landmark array, `angles` the joint angles indexed by JOINT_INDEX.
+        """
+        return 0.0, False
+
+    def update_state(self, main_angle, form_ok):
+        """Placeholder method to be overridden by specific exercise logic."""
+        pass
+
+    def set_thresholds(self, down=None, up=None):
+        """Overrides the down/up angle thresholds (None keeps the current one), e.g. to re-score a trace."""
+        if down is not None:
+            self.down_angle_threshold = down
+        if up is not None:
+            self.up_angle_threshold = up
+
+    def draw_data(self, frame, width):
+        """Draws common data (FPS, Reps/Time)."""
+        session_duration = self.clock() - self.session_start_time
+
+        # Display Reps or Time based on the exercise's rule mode
+        timed = RULES.get(self.exercise, {}).get("mode") == "hold"
+        metric_label = "Time" if timed else "Reps"
+        metric_value = f"{self.counter:.1f}s" if timed else f"{int(self.counter)}"
+
+        # Panels are only re-rendered when their text changes; draw_overlay composites them
+        overlay = self.overlay
+        overlay.text("exercise", f"Exercise: {self.exercise}", (10, 30), (255, 255, 255))
+        overlay.text("metric", f"{metric_label}: {metric_value}", (10, 70), (255, 255, 0), scale=1.0)
+        overlay.text("session", f"Session: {format_time(session_duration)}", (10, 110), (255, 165, 0))
+        overlay.text("fps", f"FPS: {self.fps:.1f}", (width - 120, 30), (0, 255, 255))
+
+        form_color = (0, 255, 0) if self.form_ok else (0, 0, 255)
+        overlay.text("form", f"Form: {'OK' if self.form_ok else 'BAD'}", (10, 150), form_color)
+        overlay.text("message", self.display_message, (10, 190), (255, 255, 255))
+
+
+    def prepare_input(self, frame):
+        """
+        Builds the RGB image fed to MediaPipe, downscaled per the inference resolution settings.
+        Landmarks are normalized, so they map straight back onto the full-resolution frame.
+        """
+        height, width = frame.shape[:2]
+        scale = self.options["inference_scale"] or 1.0
+        short_side = self.options["inference_short_side"]
+        if short_side:
+            scale = min(scale, short_side / min(height, width))
+        stage_start = time.perf_counter()
+        if scale < 1.0:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.timings.record("cvtColor", time.perf_counter() - stage_start)
+        return frame_rgb
+
+    def detect(self, image):
+        """Runs the pose model on an RGB image. Returns (landmark array, landmark list), or (None, None)."""
+        stage_start = time.perf_counter()
+        if self.remote_pose:
+            landmarks = self.pose.process(image, self.landmarks)
+            self.timings.record("pose.process", time.perf_counter() - stage_start)
+            return landmarks, None
+        results = self.pose.process(image)
+        self.timings.record("pose.process", time.perf_counter() - stage_start)
+        if not results.pose_landmarks:
+            return None, None
+        return landmarks_to_array(results.pose_landmarks, self.landmarks), results.pose_landmarks
+
+    def set_model_complexity(self, complexity):
+        """Swaps the pose graph for one of another complexity. Rep and hold state are untouched."""
+        previous = self.pose_options["model_complexity"]
+        options = {**self.pose_options, "model_complexity": complexity}
+        if self.remote_pose:
+            switched = self.pose.configure(**options)
+        else:
+            instances = get_pose_instances()
+            try:
+                pose = instances.checkout(**options)
+            except Exception:
+                pose = None
+            if pose is not None:
+                instances.checkin(self.pose)
+                self.pose = pose
+            switched = pose is not None
+        if not switched:
+            # Lite/heavy models are downloaded on first use, which can fail
+            if self.governor is not None:
+                self.governor.mark_unavailable(complexity, previous)
+            return
+        self.pose_options = options
+        self.roi = None
+
+    def run_pose(self, frame):
+        """
+        Runs MediaPipe on a BGR frame. Returns (landmark array, landmark list), or (None, None).
+        In ROI mode only the region around the last detected body is processed and the
+        landmarks are mapped back to full-frame coordinates.
+        """
+        height, width = frame.shape[:2]
+        roi = self.roi
+        if roi is not None:
+            x0, y0, x1, y1 = roi
+            frame = frame[y0:y1, x0:x1]
+
+        landmarks, landmark_list = self.detect(self.prepare_input(frame))
+        if landmarks is None:
+            # Detection lost, fall back to the full frame
+            self.roi = None
+            return None, None
+
+        if roi is not None:
+            uncrop_landmarks(landmarks, roi, width, height)
+            landmark_list = None # Crop coordinates, rebuilt from the array if needed
+        if self.options["roi_crop"]:
+            self.roi = landmark_roi(landmarks, width, height, self.options["roi_padding"], self.options["roi_min_size"])
+        return landmarks, landmark_list
+
+    def estimate_pose(self, frame):
+        """
+        Returns the landmarks for this frame: from inference, reused by the motion gate
+        or predicted by the scheduler. The landmark list is None when it has to be rebuilt
+        from the array (reused, predicted or cropped frames).
+        """
+        if self.motion_gate is not None and self.motion_gate.is_static(frame):
+            self.landmarks[:] = self.motion_gate.landmarks
+            return self.landmarks, None
+
+        now = self.clock()
+        if self.scheduler is not None and not self.scheduler.should_infer():
+            return self.scheduler.predict(now, self.landmarks), None
+
+        inference_start = time.perf_counter()
+        landmarks, landmark_list = self.run_pose(frame)
+        latency = time.perf_counter() - inference_start
+        self.frames_inferred += 1
+        if self.scheduler is not None:
+            self.scheduler.record(landmarks, now, latency)
+        if self.governor is not None:
+            complexity = self.governor.observe(latency, time.monotonic())
+            if complexity is not None:
+                self.set_model_complexity(complexity)
+
+        if self.motion_gate is not None:
+            self.motion_gate.refresh(landmarks)
+        return landmarks, landmark_list
+
+    def analysis_failed(self, error):
+        """Called on the worker thread when analyze() raised; publishes the error count."""
+        self.analysis_errors += 1
+        self.publish_snapshot()
+
+    def analyze(self, frame):
+        """Runs pose estimation and the exercise logic on a BGR frame. Returns (landmarks, landmark_list)."""
+        landmarks, landmark_list = self.estimate_pose(frame)
+        if self.trace is not None:
+            self.trace.write(self.clock(), landmarks)
+        if landmarks is not None:
+            self.score(landmarks)
+        else:
+            self.telemetry.append(self.clock() - self.session_start_time, np.nan, 0.0, 0.0)
+        self.publish_snapshot()
+        return landmarks, landmark_list
+
+    def score(self, landmarks):
+        """Runs the exercise logic on one frame's (33, 4) landmark array."""
+        stage_start = time.perf_counter()
+        angles = joint_angles(landmarks, self.angles)
+        main_angle = np.nan
+        try:
+            main_angle, self.form_ok = self.calculate_metrics(landmarks, angles)
+            metrics_done = time.perf_counter()
+            self.update_state(main_angle, self.form_ok)
+            self.timings.record("calculate_metrics", metrics_done - stage_start)
+            self.timings.record("update_state", time.perf_counter() - metrics_done)
+        except Exception:
+            self.display_message = "Landmarks missing or error in calculation."
+            self.form_ok = False
+        self.frames_scored += 1
+        self.form_ok_frames += self.form_ok
+        self.telemetry.append(self.clock() - self.session_start_time, main_angle, self.form_ok,
+                              landmarks[:, 3].mean())
+
+    def draw_overlay(self, frame, landmarks, landmark_list):
+        """Draws the skeleton and the tracker data onto the frame."""
+        height, width, _ = frame.shape
+        stage_start = time.perf_counter()
+        if landmarks is not None:
+            if landmark_list is None:
+                landmark_list = to_landmark_list(landmarks)
+            self.drawer.draw_landmarks(frame, landmark_list, self.mp_pose.POSE_CONNECTIONS,
+                                       landmark_drawing_spec=self.styles.get_default_pose_landmarks_style())
+            self.timings.record("draw_landmarks", time.perf_counter() - stage_start)
+            stage_start = time.perf_counter()
+        else:
+            cv2.putText(frame, "No body detected", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        self.overlay.begin(frame)
+        self.draw_data(frame, width)
+        self.overlay.composite(frame)
+        self.timings.record("putText", time.perf_counter() - stage_start)
+
+    def process_frame(self, frame, annotate=True):
+        """
+        Analyses a BGR frame and draws the overlay onto it.
+        In async mode the frame goes to the worker thread and the overlay shows its latest result.
+        """
+        frame_start = time.perf_counter()
+
+        # FPS calculation
+        self.frame_count += 1
+        elapsed_time = time.time() - self.start_time
+        if elapsed_time >= 1.0:
+            self.fps = self.frame_count / elapsed_time
+            self.frame_count = 0
+            self.start_time = time.time()
+
+        if self.worker is not None:
+            # The worker reads the submitted frame, so draw on a copy
+            self.worker.submit(frame)
+            if annotate:
+                frame = frame.copy()
+            landmarks, landmark_list = self.worker.latest()
+        else:
+            landmarks, landmark_list = self.analyze(frame)
+
+        if annotate:
+            self.draw_overlay(frame, landmarks, landmark_list)
+        if self.options["landmarks_only"]:
+            live_state.publish(self.session_id, self.state_message(landmarks))
+        self.timings.record("frame", time.perf_counter() - frame_start)
+        return frame
+
+    def state_message(self, landmarks):
+        """Compact tracker state for the browser overlay in landmarks-only mode."""
+        snapshot = self.snapshot
+        return {
+            "exercise": snapshot.exercise,
+            "timed": RULES.get(snapshot.exercise, {}).get("mode") == "hold",
+            "counter": snapshot.counter,
+            "form_ok": snapshot.form_ok,
+            "message": snapshot.message,
+            "angle": snapshot.angle,
+            "fps": self.fps,
+            "elapsed": self.clock() - self.session_start_time,
+            "landmarks": live_state.encode_landmarks(landmarks) if landmarks is not None else None,
+        }
+
+    def transform(self, frame):
+        stage_start = time.perf_counter()
+        frame = frame.to_ndarray(format="bgr24")
+        self.timings.record("to_ndarray", time.perf_counter() - stage_start)
+        # In landmarks-only mode the stream is receive-only, so there is nothing to draw on
+        frame = self.process_frame(frame, annotate=not self.options["landmarks_only"])
+        if self.exporter is not None:
+            # Never blocks: frames the encoder has no room for are dropped and counted
+            self.exporter.submit(frame)
+        return frame
+
+    def close(self):
+        """Stops the worker thread and hands the pose graph back for the next session."""
+        if self.worker is not None:
+            if not self.worker.stop():
+                # Still inside pose.process, the graph can't be reused safely
+                self.pose = None
+            self.worker = None
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self.exporter is not None:
+            # The encoder drains its queue and closes the file on its own thread
+            self.exporter.close(timeout=0)
+            if self.exporter.dropped:
+                print(f"Warning: Video export {self.exporter.path} dropped {self.exporter.dropped} frames; the encoder fell behind.")
+            write_rows(self.snapshot.reps, f"{self.export_path}.{self.options['export_format']}")
+            self.exporter = None
+        metrics.unregister(self.timings)
+        if self.options["landmarks_only"]:
+            live_state.discard(self.session_id)
+        if self.pose is None:
+            return
+        if self.remote_pose:
+            # Frees the session's graph and shared memory in the pool
+            self.pose.close()
+        else:
+            get_pose_instances().checkin(self.pose)
+        self.pose = None
+
+    def on_ended(self):
+        """Called by streamlit-webrtc when the input track ends."""
+        self.close()
+
+
+# --------------------------------------------------------------------------
+# --- Rule-Driven Trackers (see rules.RULES) ---
+# --------------------------------------------------------------------------
+class RuleTracker(BaseExerciseTracker):
+    """Tracker for an exercise defined by a rule: angle extraction, form checks and state machine come from RULES."""
+    rule_name = None
+
+    def __init__(self, session_start_time=None, clock=None, **options):
+        self.rule = RULES[self.rule_name]
+        options = {**self.rule.get("options", {}), **options}
+        super().__init__(self.rule_name, self.rule["down"], self.rule["up"], session_start_time, clock, **options)
+        self.evaluator = compile_rules((self.rule_name,))
+        init_state(self, self.rule)
+        self.publish_snapshot()
+
+    def calculate_metrics(self, landmarks, angles):
+        main_angles, form_ok, _ = self.evaluator.evaluate(landmarks, angles)
+        return float(main_angles[0]), bool(form_ok[0])
+
+    def update_state(self, main_angle, form_ok):
+        step_state(self, self.rule, main_angle, form_ok, self.clock())
+
+    def draw_data(self, frame, width):
+        super().draw_data(frame, width)
+        if self.rule["mode"] == "reps":
+            self.overlay.text("angle", f"{self.rule['angle_label']}: {self.current_angle:.1f} deg", (10, 230), (255, 255, 255))
+
+
+# --- 1. PUSH-UP TRACKER (Repetition Counting) ---
+class PushupTracker(RuleTracker):
+    rule_name = "Push-up"
+
+
+# --- 2. SQUAT TRACKER (Repetition Counting) ---
+class SquatTracker(RuleTracker):
+    rule_name = "Squat"
+
+
+# --- 3. PLANK TRACKER (Time-based/Hold) ---
+class PlankTracker(RuleTracker):
+    rule_name = "Plank"
+
+
+def rule_tracker(name):
+    """Tracker class for a rule that has no class of its own (e.g. Lunge)."""
+    return type(f"{name.replace('-', '')}Tracker", (RuleTracker,), {"rule_name": name})
+
+
+# --- Mapping Exercise Names to Tracker Classes ---
+TRACKER_MAPPING = {
+    "Push-up": PushupTracker,
+    "Squat": SquatTracker,
+    "Plank": PlankTracker,
+}
+TRACKER_MAPPING.update({name: rule_tracker(name) for name in RULES if name not in TRACKER_MAPPING})
+
+
+# --------------------------------------------------------------------------
+# --- Automatic Exercise Detection ---
+# --------------------------------------------------------------------------
+class AutoTracker(RuleTracker):
+    """
+    Works out which exercise is being performed, then tracks it like its RuleTracker.
+    Every rule in RULES is evaluated on the same landmarks and angles in one compiled
+    pass, and each runs its own state machine on a lightweight ExerciseState. The first
+    rep exercise to complete `lock_reps` reps in its detected body position wins, or a
+    hold held for `lock_hold_seconds` while no rep exercise has started a rep. Reps and
+    hold time from the detection phase carry over.
+    """
+    def __init__(self, session_start_time=None, clock=None, lock_reps=2, lock_hold_seconds=8.0, **options):
+        BaseExerciseTracker.__init__(self, AUTO_EXERCISE, None, None, session_start_time, clock, **options)
+        self.rule = None
+        self.current_angle = None
+        self.display_message = "Detecting exercise..."
+        self.lock_reps = lock_reps
+        self.lock_hold_seconds = lock_hold_seconds
+        # This tracker's own evaluator: _frame holds its output arrays until detect() runs
+        self.evaluator = compile_rules(detect=True)
+        self.candidates = [ExerciseState(RULES[name]) for name in self.evaluator.names]
+        self._frame = None
+        self.publish_snapshot()
+
+    def calculate_metrics(self, landmarks, angles):
+        if self.rule is not None:
+            return super().calculate_metrics(landmarks, angles)
+        self._frame = self.evaluator.evaluate(landmarks, angles)
+        main_angles, form_ok, detected = self._frame
+        return 0.0, bool((form_ok & detected).any())
+
+    def update_state(self, main_angle, form_ok):
+        if self.rule is not None:
+            super().update_state(main_angle, form_ok)
+        else:
+            self.detect()
+
+    def detect(self):
+        """Steps every candidate exercise on the current frame and locks on when one is clear."""
+        main_angles, form_ok, detected = self._frame
+        now = self.clock()
+        names = self.evaluator.names
+        for i, state in enumerate(self.candidates):
+            rule = RULES[names[i]]
+            if detected[i]:
+                step_state(state, rule, float(main_angles[i]), bool(form_ok[i]), now)
+            elif rule["mode"] == "hold":
+                # Out of position breaks a hold
+                step_state(state, rule, 0.0, False, now)
+
+        reps = [i for i, name in enumerate(names) if RULES[name]["mode"] == "reps"]
+        best = max(reps, key=lambda i: self.candidates[i].counter, default=None)
+        if best is not None and self.candidates[best].counter >= self.lock_reps:
+            self.lock(best)
+            return
+        rep_started = any(self.candidates[i].counter or self.candidates[i].state == "waiting_up" for i in reps)
+        for i, name in enumerate(names):
+            if RULES[name]["mode"] == "hold" and self.candidates[i].counter >= self.lock_hold_seconds and not rep_started:
+                self.lock(i)
+                return
+
+    def set_thresholds(self, down=None, up=None):
+        # Candidates count the reps until lock(), which takes over the winner's thresholds
+        super().set_thresholds(down, up)
+        for state in self.candidates or ():
+            if down is not None:
+                state.down_angle_threshold = down
+            if up is not None:
+                state.up_angle_threshold = up
+
+    def lock(self, index):
+        """Switches to tracking one exercise, keeping its progress from the detection phase."""
+        name = self.evaluator.names[index]
+        state = self.candidates[index]
+        self.rule_name = name
+        self.rule = RULES[name]
+        self.exercise = name
+        self.evaluator = compile_rules((name,))
+        self.candidates = None
+        self._frame = None
+        for attribute, value in vars(state).items():
+            setattr(self, attribute, value)
+        self.display_message = f"Detected {name}!"
+        if self.rule.get("options", {}).get("motion_gate") and self.motion_gate is None:
+            self.motion_gate = MotionGate(self.options["motion_threshold"], self.options["motion_refresh_frames"])
+
+    def draw_data(self, frame, width):
+        if self.rule is not None:
+            super().draw_data(frame, width)
+        else:
+            BaseExerciseTracker.draw_data(self, frame, width)
+
+
+def tracker_class(exercise):
+    """Tracker class for an exercise name, including AUTO_EXERCISE."""
+    return AutoTracker if exercise == AUTO_EXERCISE else TRACKER_MAPPING[exercise]
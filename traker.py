@@ -1,17 +1,24 @@
-import streamlit as st
-from streamlit_webrtc import webrtc_streamer, VideoTransformerBase, WebRtcMode
-import cv2
-import mediapipe as mp
-import numpy as np
 import time
-import random
+_run_started = time.perf_counter() # Start of this script run, for the startup report
 
-# --- Standard Angle Configuration ---
-CONFIG = {
-    "Push-up": {"down": 70.0, "up": 160.0, "desc": "Elbows"},
-    "Squat": {"down": 90.0, "up": 170.0, "desc": "Knees"},
-    "Plank": {"down": 10.0, "up": 10.0, "desc": "Time"},
-}
+import streamlit as st
+import streamlit.components.v1 as components
+import random
+import sqlite3
+import threading
+import uuid
+
+# cv2, mediapipe and streamlit_webrtc are not imported here: they load with trackers.py on a
+# background thread (see start_warm_up) and the page imports them only when a stream starts.
+from config import AUTO_EXERCISE, CONFIG, EXERCISES, PIPELINE, format_time
+from export import FORMATS, encode_rows
+from history import get_history_store
+import live_state
+import metrics
+from rules import RULES
+from telemetry import downsample
+
+_imports_done = time.perf_counter()
 
 # --- Quotes for positive feedback ---
 POSITIVE_QUOTES = [
@@ -22,342 +29,41 @@ POSITIVE_QUOTES = [
     "Keep pushing your limits. You are stronger than you think!",
 ]
 
-# --- Helper Functions ---
-def calculate_angle(a, b, c):
-    """Calculates the angle between three points (A, B, C) with B as the vertex."""
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
+LIVE_METRICS_INTERVAL = 0.5 # Seconds between polls of the tracker snapshot while streaming
+LIVE_REP_ROWS = 5 # Latest reps (or broken holds) shown under the live metrics
 
-    ba = a - b
-    bc = c - b
-    
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-    angle = np.arccos(cosine_angle)
-    
-    return np.degrees(angle)
-
-def format_time(seconds):
-    """Formats seconds into H:MM:SS."""
-    if seconds < 0:
-        seconds = 0
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    return f"{h:02}:{m:02}:{s:02}"
-
-# --- Base Exercise Tracking Class ---
-class BaseExerciseTracker(VideoTransformerBase):
-    def __init__(self, exercise_name, down_angle, up_angle):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False, model_complexity=1,
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        )
-        self.drawer = mp.solutions.drawing_utils
-        self.styles = mp.solutions.drawing_styles
-        
-        self.exercise = exercise_name
-        self.down_angle_threshold = down_angle
-        self.up_angle_threshold = up_angle
-        self.counter = 0.0 # Use float for plank time
-        self.form_ok = False
-        self.display_message = "Waiting to start..."
-        self.session_data = [] # List to store data after each rep
-        
-        self.start_time = time.time()
-        self.frame_count = 0
-        self.fps = 0
-        # Store initial session start time from Streamlit state
-        self.session_start_time = st.session_state.get('session_start_time', time.time())
-
-    def save_session_data(self):
-        """
-        Explicitly saves final data to Streamlit session state. 
-        This is called reliably by the 'Stop Stream' button callback.
-        """
-        st.session_state['rep_data'] = self.session_data
-        st.session_state['final_count'] = self.counter # Reps or total time held
-        # Calculate the total session time elapsed
-        st.session_state['final_time'] = time.time() - self.session_start_time 
-        st.session_state['exercise_type'] = self.exercise
-
-    def calculate_metrics(self, landmarks):
-        """Placeholder method to be overridden by specific exercise logic."""
-        return 0.0, False 
-
-    def update_state(self, main_angle, form_ok):
-        """Placeholder method to be overridden by specific exercise logic."""
-        pass 
-
-    def draw_data(self, frame, width):
-        """Draws common data (FPS, Reps/Time)."""
-        session_duration = time.time() - self.session_start_time
-        
-        # Display Reps or Time based on exercise type
-        metric_label = "Reps" if self.exercise != "Plank" else "Time"
-        metric_value = f"{int(self.counter)}" if self.exercise != "Plank" else f"{self.counter:.1f}s"
-        
-        cv2.putText(frame, f"Exercise: {self.exercise}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(frame, f"{metric_label}: {metric_value}", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 0), 2)
-        cv2.putText(frame, f"Session: {format_time(session_duration)}", (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 165, 0), 2)
-        cv2.putText(frame, f"FPS: {self.fps:.1f}", (width - 120, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        
-        form_color = (0, 255, 0) if self.form_ok else (0, 0, 255)
-        cv2.putText(frame, f"Form: {'OK' if self.form_ok else 'BAD'}", (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, form_color, 2)
-        cv2.putText(frame, self.display_message, (10, 190), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
 
+# --- Startup (once per server process) ---
+@st.cache_resource
+def startup_times():
+    """Process-wide startup measurements in ms, filled in as each stage finishes."""
+    return {"page_imports_ms": (_imports_done - _run_started) * 1000}
 
-    def transform(self, frame):
-        frame = frame.to_ndarray(format="bgr24")
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        results = self.pose.process(frame_rgb)
-        height, width, _ = frame.shape
-
-        # FPS calculation
-        self.frame_count += 1
-        elapsed_time = time.time() - self.start_time
-        if elapsed_time >= 1.0:
-            self.fps = self.frame_count / elapsed_time
-            self.frame_count = 0
-            self.start_time = time.time()
-
-        if results.pose_landmarks:
-            self.drawer.draw_landmarks(frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                                       landmark_drawing_spec=self.styles.get_default_pose_landmarks_style())
-
-            landmarks = results.pose_landmarks.landmark
-            try:
-                main_angle, self.form_ok = self.calculate_metrics(landmarks)
-                self.update_state(main_angle, self.form_ok)
-            except Exception:
-                self.display_message = "Landmarks missing or error in calculation."
-                self.form_ok = False
-                
-        else:
-            cv2.putText(frame, "No body detected", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
 
-        self.draw_data(frame, width)
-        return frame
+def warm_up(times):
+    """Imports the tracker stack and warms a pose graph, so the first stream counts from its first frame."""
+    started = time.perf_counter()
+    import trackers # noqa: F401 (cv2, mediapipe, streamlit_webrtc)
+    times["tracker_import_ms"] = (time.perf_counter() - started) * 1000
+    if not PIPELINE["pose_workers"]:
+        started = time.perf_counter()
+        from pose_models import get_pose_instances
+        get_pose_instances().prewarm()
+        times["pose_warm_up_ms"] = (time.perf_counter() - started) * 1000
 
 
-# --------------------------------------------------------------------------
-# --- 1. PUSH-UP TRACKER (Repetition Counting) ---
-# --------------------------------------------------------------------------
-class PushupTracker(BaseExerciseTracker):
-    def __init__(self):
-        super().__init__("Push-up", CONFIG["Push-up"]["down"], CONFIG["Push-up"]["up"])
-        self.state = "waiting_down"
-        self.current_angle = 0.0
-        self.current_rep_min_angle = 180.0
-        self.rep_start_time = None
-
-    def check_form(self, landmarks):
-        """Checks for plank-like form (hip alignment)."""
-        try:
-            shoulder_y = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-            hip_y = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y
-            ankle_y = landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y
-            mid_y = (shoulder_y + ankle_y) / 2
-            # Check if hip is too far up or down (poor plank form)
-            return abs(hip_y - mid_y) < 0.15 
-        except IndexError:
-            return False
-
-    def get_elbow_angle(self, landmarks):
-        """Calculates the elbow angle for the left arm."""
-        try:
-            shoulder = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-            elbow = landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value]
-            wrist = landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value]
-
-            coords = [[l.x, l.y] for l in [shoulder, elbow, wrist]]
-            return calculate_angle(coords[0], coords[1], coords[2])
-        except Exception:
-            return 180.0
-
-    def calculate_metrics(self, landmarks):
-        angle = self.get_elbow_angle(landmarks)
-        self.current_angle = angle
-        form_ok = self.check_form(landmarks)
-        
-        # Track minimum angle for form feedback
-        if self.state == "waiting_up":
-            self.current_rep_min_angle = min(self.current_rep_min_angle, angle)
-            
-        return angle, form_ok
-
-    def update_state(self, main_angle, form_ok):
-        if not form_ok:
-            self.display_message = "Adjust Form! (Hips/Back)"
-            # Don't reset state, but don't count reps
-        
-        if form_ok:
-            if self.state == "waiting_down":
-                if main_angle < self.down_angle_threshold:
-                    self.state = "waiting_up"
-                    self.display_message = "Down! Now Push Up"
-                    self.rep_start_time = time.time()
-            
-            elif self.state == "waiting_up":
-                if main_angle > self.up_angle_threshold:
-                    self.counter += 1
-                    rep_duration = time.time() - self.rep_start_time if self.rep_start_time else 0.0
-                    self.state = "waiting_down"
-                    self.display_message = "Nice Rep!"
-                    
-                    # Store data after successful rep
-                    self.session_data.append({
-                        "rep": int(self.counter), 
-                        "form_ok": form_ok, 
-                        "min_angle": self.current_rep_min_angle,
-                        "duration": rep_duration
-                    })
-                    self.current_rep_min_angle = 180.0 # Reset min angle for next rep
-                    self.rep_start_time = None
-                else:
-                    self.display_message = "Extend Arms Fully"
-            
-    def draw_data(self, frame, width):
-        super().draw_data(frame, width)
-        cv2.putText(frame, f"Elbow Angle: {self.current_angle:.1f} deg", (10, 230), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+@st.cache_resource
+def start_warm_up():
+    """Starts warm_up on a background thread the first time any page is shown."""
+    thread = threading.Thread(target=warm_up, args=(startup_times(),), name="tracker-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 
-# --------------------------------------------------------------------------
-# --- 2. SQUAT TRACKER (Repetition Counting) ---
-# --------------------------------------------------------------------------
-class SquatTracker(BaseExerciseTracker):
-    def __init__(self):
-        super().__init__("Squat", CONFIG["Squat"]["down"], CONFIG["Squat"]["up"])
-        self.state = "waiting_down"
-        self.current_angle = 180.0
-        self.current_rep_min_angle = 180.0
-        self.rep_start_time = None
-
-    def get_knee_angle(self, landmarks):
-        """Calculates the hip-knee-ankle angle for the left side."""
-        try:
-            hip = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value]
-            knee = landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value]
-            ankle = landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value]
-            
-            coords = [[l.x, l.y] for l in [hip, knee, ankle]]
-            return calculate_angle(coords[0], coords[1], coords[2])
-        except Exception:
-            return 180.0
-
-    def check_form(self, landmarks):
-        """Checks for depth and back straightness (simplified)."""
-        # Simple check for depth: Hip should not drop below the knee line horizontally
-        try:
-            return landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y < landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y
-        except IndexError:
-            return False
-
-    def calculate_metrics(self, landmarks):
-        angle = self.get_knee_angle(landmarks)
-        self.current_angle = angle
-        form_ok = self.check_form(landmarks)
-        
-        # Track minimum angle for form feedback
-        if self.state == "waiting_up":
-            self.current_rep_min_angle = min(self.current_rep_min_angle, angle)
-            
-        return angle, form_ok
-
-    def update_state(self, main_angle, form_ok):
-        if self.state == "waiting_down":
-            if main_angle < self.down_angle_threshold:
-                self.state = "waiting_up"
-                self.display_message = "Deep Squat! Push Up"
-                self.rep_start_time = time.time()
-            else:
-                self.display_message = "Squat Deeper (Knee Angle)"
-        
-        elif self.state == "waiting_up":
-            if main_angle > self.up_angle_threshold:
-                self.counter += 1
-                rep_duration = time.time() - self.rep_start_time if self.rep_start_time else 0.0
-                self.state = "waiting_down"
-                self.display_message = "Nice Rep!"
-                
-                # Store data after successful rep
-                self.session_data.append({
-                    "rep": int(self.counter), 
-                    "form_ok": form_ok, 
-                    "min_angle": self.current_rep_min_angle,
-                    "duration": rep_duration
-                })
-                self.current_rep_min_angle = 180.0 # Reset min angle for next rep
-                self.rep_start_time = None
-            else:
-                self.display_message = "Stand Up Fully"
-                
-    def draw_data(self, frame, width):
-        super().draw_data(frame, width)
-        cv2.putText(frame, f"Knee Angle: {self.current_angle:.1f} deg", (10, 230), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+def finish_run():
+    """Records how long this script run took, for the startup report on the next one."""
+    st.session_state['last_run_ms'] = (time.perf_counter() - _run_started) * 1000
 
-# --------------------------------------------------------------------------
-# --- 3. PLANK TRACKER (Time-based/Hold) ---
-# --------------------------------------------------------------------------
-class PlankTracker(BaseExerciseTracker):
-    def __init__(self):
-        super().__init__("Plank", CONFIG["Plank"]["down"], CONFIG["Plank"]["up"])
-        self.is_holding = False
-        self.hold_start_time = None
-        self.elapsed_time = 0.0
-
-    def check_form(self, landmarks):
-        """Checks for near-straight line alignment (shoulder, hip, ankle)."""
-        try:
-            shoulder_y = landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-            hip_y = landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y
-            ankle_y = landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y
-            
-            mid_y = (shoulder_y + ankle_y) / 2
-            # Check for straight line alignment with tighter tolerance
-            return abs(hip_y - mid_y) < 0.05 
-        except IndexError:
-            return False
-
-    def calculate_metrics(self, landmarks):
-        # Angle is irrelevant for plank, focus on form check
-        return 0.0, self.check_form(landmarks)
-
-    def update_state(self, main_angle, form_ok):
-        current_time = time.time()
-        
-        if form_ok:
-            if not self.is_holding:
-                # Start new hold
-                self.is_holding = True
-                self.hold_start_time = current_time - self.elapsed_time # Continue from last time
-                self.display_message = "Form OK! HOLD"
-            else:
-                # Update time held
-                self.counter = current_time - self.hold_start_time
-                self.display_message = f"HOLDING: {int(self.counter)}s"
-                
-        else:
-            if self.is_holding:
-                # Form broken - stop holding, update final count
-                self.elapsed_time = self.counter 
-                self.session_data.append({"time_held": self.elapsed_time, "form_ok": False}) 
-                
-            self.is_holding = False
-            self.hold_start_time = None
-            self.display_message = "BAD FORM! Adjust Hips/Back"
-            self.counter = self.elapsed_time # Keep displaying the total time held so far
-
-
-# --- Mapping Exercise Names to Tracker Classes ---
-TRACKER_MAPPING = {
-    "Push-up": PushupTracker,
-    "Squat": SquatTracker,
-    "Plank": PlankTracker,
-}
 
 # --------------------------------------------------------------------------
 # --- Streamlit UI (Global Scope) ---
@@ -366,29 +72,51 @@ TRACKER_MAPPING = {
 st.set_page_config(page_title="💪 AI Pocket Coach", layout="wide")
 st.title("💪 AI Powered Pocket Coach")
 
+start_warm_up()
+
+# Per-stage timings for a local scraper (started once per server process)
+if PIPELINE["metrics_port"]:
+    metrics.serve_metrics(PIPELINE["metrics_port"])
+# Landmarks-only mode: the browser overlay polls each session's state from this endpoint
+if PIPELINE["landmarks_only"]:
+    live_state.serve_state(PIPELINE["state_port"], st.get_option("server.port"), PIPELINE["state_host"])
+
 # --- Sidebar Exercise Selector ---
 st.sidebar.header("Select Exercise")
 selected_exercise = st.sidebar.radio(
     "Choose your workout:",
-    list(TRACKER_MAPPING.keys()),
+    EXERCISES,
     key="exercise_selector"
 )
-
-# --- Session State Initialization ---
-if 'is_started' not in st.session_state:
-    st.session_state['is_started'] = False
-if 'show_summary' not in st.session_state:
-    st.session_state['show_summary'] = False
-if 'rep_data' not in st.session_state:
-    st.session_state['rep_data'] = []
-if 'session_start_time' not in st.session_state:
-    st.session_state['session_start_time'] = time.time()
-if 'final_count' not in st.session_state:
-    st.session_state['final_count'] = 0.0
-if 'final_time' not in st.session_state:
-    st.session_state['final_time'] = 0.0
-if 'exercise_type' not in st.session_state:
-    st.session_state['exercise_type'] = selected_exercise
+# Sessions are stored in the workout history under this name
+st.sidebar.text_input("Your name:", value="default", key="user_name")
+
+# --- Startup Report (Sidebar) ---
+with st.sidebar.expander("🚀 Startup"):
+    times = startup_times()
+    report = [f"* Page imports: **{times['page_imports_ms']:.0f} ms**"]
+    if 'tracker_import_ms' in times:
+        report.append(f"* Tracker stack (cv2, mediapipe, webrtc): **{times['tracker_import_ms']:.0f} ms**, in the background")
+        if 'pose_warm_up_ms' in times:
+            report.append(f"* Pose graph warm-up: **{times['pose_warm_up_ms']:.0f} ms**")
+    else:
+        report.append("* Tracker stack: loading in the background...")
+    if 'last_run_ms' in st.session_state:
+        report.append(f"* Previous page run: **{st.session_state['last_run_ms']:.0f} ms**")
+    st.markdown("\n".join(report))
+
+# --- Session State Initialization (first run of a browser session) ---
+if 'session_key' not in st.session_state:
+    st.session_state.update({
+        'is_started': False,
+        'show_summary': False,
+        'rep_data': [],
+        'session_start_time': time.time(),
+        'final_count': 0.0,
+        'final_time': 0.0,
+        'exercise_type': selected_exercise,
+        'session_key': uuid.uuid4().hex,
+    })
     
 # --- CSS Injection ---
 st.markdown(
@@ -419,8 +147,11 @@ def start_button_callback():
     st.session_state['is_started'] = True
     st.session_state['show_summary'] = False
     st.session_state['rep_data'] = []
+    st.session_state['telemetry'] = None
     st.session_state['session_start_time'] = time.time()
     st.session_state['exercise_type'] = st.session_state['exercise_selector']
+    # Key of the session's published state in landmarks-only mode; hard to guess, it carries pose data
+    st.session_state['session_key'] = uuid.uuid4().hex
     # Clear old results
     st.session_state['final_count'] = 0.0
     st.session_state['final_time'] = 0.0
@@ -434,7 +165,15 @@ def stop_button_callback():
         webrtc_ctx = st.session_state['active_tracker_stream']
         if webrtc_ctx and webrtc_ctx.video_transformer:
             # Explicitly call the save method on the live tracker instance
-            webrtc_ctx.video_transformer.save_session_data() 
+            webrtc_ctx.video_transformer.save_session_data(st.session_state)
+            try:
+                get_history_store().record_session(
+                    st.session_state['user_name'].strip() or "default", st.session_state['exercise_type'],
+                    st.session_state['session_start_time'], st.session_state['final_time'],
+                    st.session_state['final_count'], st.session_state['rep_data'],
+                )
+            except sqlite3.Error as e:
+                print(f"Warning: Could not save the session to the workout history: {e}")
         else:
             print("Warning: Could not access live video transformer for final data save.")
     
@@ -445,6 +184,47 @@ def new_session_callback():
     st.session_state['show_summary'] = False
 
 
+# --- Live Metrics ---
+def render_live_metrics(snapshot):
+    """Draws live metrics from a tracker snapshot (see trackers.TrackerSnapshot)."""
+    mode = RULES.get(snapshot.exercise, {}).get("mode")
+    form_ratio = snapshot.form_ok_frames / snapshot.frames * 100 if snapshot.frames else 0.0
+    col_count, col_time, col_form = st.columns(3)
+    with col_count:
+        if mode == "hold":
+            st.metric("Time Held", f"{snapshot.counter:.1f}s")
+        elif mode == "reps":
+            st.metric(f"{snapshot.exercise} Reps", f"{int(snapshot.counter)}")
+        else:
+            st.metric("Exercise", "Detecting...")
+    with col_time:
+        st.metric("Session Time", format_time(snapshot.elapsed))
+    with col_form:
+        st.metric("Frames with OK Form", f"{form_ratio:.0f}%")
+    st.caption(snapshot.message)
+    if snapshot.errors:
+        st.warning(f"{snapshot.errors} frames could not be analysed; the view shows the last good result.")
+
+    latest = snapshot.reps[-LIVE_REP_ROWS:]
+    if mode == "reps" and latest:
+        st.dataframe(
+            [
+                {
+                    "Rep #": data['rep'],
+                    "Form Status": "✅ OK" if data.get('form_ok') else "❌ BAD FORM",
+                    "Min Angle": f"{data.get('min_angle', 0):.1f} deg",
+                    "Duration": f"{data.get('duration', 0):.1f} s",
+                } for data in reversed(latest)
+            ],
+            use_container_width=True,
+        )
+    elif mode == "hold" and latest:
+        st.dataframe(
+            [{"Hold Broken At": f"{data['time_held']:.1f} s"} for data in reversed(latest)],
+            use_container_width=True,
+        )
+
+
 # --- Main Content Display ---
 
 if not st.session_state['is_started'] and not st.session_state['show_summary']:
@@ -455,10 +235,47 @@ if not st.session_state['is_started'] and not st.session_state['show_summary']:
     # Display current calibration in the main body
     st.markdown("---")
     st.subheader("Current Calibration")
-    st.markdown(
-        f"**{CONFIG[selected_exercise]['desc']}** angle for Down/Bottom = **${CONFIG.get(selected_exercise, {}).get('down', 0)}^\circ$**,"
-        f" Up/Top = **${CONFIG.get(selected_exercise, {}).get('up', 0)}^\circ$**."
-    )
+    if selected_exercise == AUTO_EXERCISE:
+        st.markdown(
+            "Every exercise below is checked on each frame; tracking locks on after two reps (or a held plank):\n\n"
+            + "\n".join(
+                f"* **{name}**: " + (f"{rule['desc']} {rule['down']:.0f}° / {rule['up']:.0f}°" if rule["mode"] == "reps" else "timed hold")
+                for name, rule in RULES.items()
+            )
+        )
+    else:
+        st.markdown(
+            f"**{CONFIG[selected_exercise]['desc']}** angle for Down/Bottom = **${CONFIG.get(selected_exercise, {}).get('down', 0)}^\circ$**,"
+            f" Up/Top = **${CONFIG.get(selected_exercise, {}).get('up', 0)}^\circ$**."
+        )
+
+    # --- Progress (daily/weekly rollups from the workout history) ---
+    st.markdown("---")
+    st.subheader("📈 Your Progress")
+    user_name = st.session_state['user_name'].strip() or "default"
+    history = get_history_store()
+    history_exercises = history.exercises(user_name)
+    if not history_exercises:
+        st.caption("Finish a session to start tracking your progress.")
+    else:
+        default_index = history_exercises.index(selected_exercise) if selected_exercise in history_exercises else 0
+        col_exercise, col_period = st.columns(2)
+        with col_exercise:
+            progress_exercise = st.selectbox("Exercise", history_exercises, index=default_index)
+        with col_period:
+            period = st.radio("Group by", ["Week", "Day"], horizontal=True).lower()
+        rows = history.progress(user_name, progress_exercise, period)
+        period_axis = [row[period] for row in rows]
+        if RULES[progress_exercise]["mode"] == "reps":
+            st.bar_chart({
+                period.title(): period_axis,
+                "Reps with OK form": [row['ok_reps'] for row in rows],
+                "Other reps": [row['reps'] - row['ok_reps'] for row in rows],
+            }, x=period.title())
+        else:
+            st.bar_chart({period.title(): period_axis, "Time held (s)": [row['hold_seconds'] for row in rows]}, x=period.title())
+        st.caption(f"{sum(row['sessions'] for row in rows)} sessions, "
+                   f"{format_time(sum(row['active_seconds'] for row in rows))} of training.")
 
 elif st.session_state['is_started']:
     # Live Tracking Screen
@@ -476,7 +293,14 @@ elif st.session_state['is_started']:
     # --- Instructions (Dynamic based on selection) ---
     st.markdown("---")
     st.subheader("🏋️ Instructions")
-    if selected_exercise == "Push-up":
+    if selected_exercise == AUTO_EXERCISE:
+            st.markdown(
+                """
+                * Ensure **full body** is visible (side view recommended).
+                * Just start your exercise: it is detected after **two reps** (or a few seconds of plank).
+                """
+            )
+    elif selected_exercise == "Push-up":
             st.markdown(
                 """
                 * Ensure **full body** is visible (side view recommended).
@@ -499,22 +323,90 @@ elif st.session_state['is_started']:
                 * The timer only runs when your form is **OK**.
                 """
             )
+    elif RULES[selected_exercise]["mode"] == "hold":
+            st.markdown(
+                """
+                * Ensure **full body** is visible (side view recommended).
+                * The timer only runs while your form is **OK**.
+                """
+            )
+    else:
+            rule = RULES[selected_exercise]
+            st.markdown(
+                f"""
+                * Ensure **full body** is visible (side view recommended).
+                * Rep counts when the **{rule['desc'].lower()}** angle drops below **${rule['down']:.0f}^\\circ$** and returns above **${rule['up']:.0f}^\\circ$**.
+                """
+            )
         
     # --- Dynamic Tracker Instance Creation ---
-    TrackerClass = TRACKER_MAPPING[st.session_state['exercise_type']]
+    # Usually already imported by the warm-up thread; otherwise this waits for it
+    from streamlit_webrtc import webrtc_streamer, WebRtcMode
+    from trackers import tracker_class
+    TrackerClass = tracker_class(st.session_state['exercise_type'])
+    session_start_time = st.session_state['session_start_time']
+    session_key = st.session_state['session_key']
+    landmarks_only = PIPELINE["landmarks_only"]
     
-    webrtc_streamer(
+    webrtc_ctx = webrtc_streamer(
             key="active_tracker_stream", # Unique key for the active stream
-            mode=WebRtcMode.SENDRECV,
-            video_transformer_factory=lambda: TrackerClass(),
+            # Landmarks-only: no annotated video comes back, the overlay below is drawn by the browser
+            mode=WebRtcMode.SENDONLY if landmarks_only else WebRtcMode.SENDRECV,
+            video_transformer_factory=lambda: TrackerClass(session_start_time, async_inference=True, session_id=session_key),
             media_stream_constraints={"video": True, "audio": False},
             async_transform=True,
     )
+
+    if landmarks_only:
+        import mediapipe as mp
+        angle_label = RULES.get(st.session_state['exercise_type'], {}).get("angle_label", "Angle")
+        components.html(
+            live_state.overlay_html(session_key, PIPELINE["state_port"], angle_label, sorted(mp.solutions.pose.POSE_CONNECTIONS)),
+            height=540,
+        )
+
+    # Filled by the polling loop at the end of the page
+    live_metrics = st.empty()
+
+    # --- Pipeline Timings (Sidebar) ---
+    with st.sidebar.expander("⏱️ Pipeline Timings"):
+        if webrtc_ctx.video_transformer:
+            st.button("Refresh Timings")
+            timings = webrtc_ctx.video_transformer.timings.summary()
+            st.dataframe(
+                [
+                    {
+                        "Stage": stage,
+                        "p50 (ms)": f"{stats['p50_ms']:.2f}",
+                        "p95 (ms)": f"{stats['p95_ms']:.2f}",
+                        "p99 (ms)": f"{stats['p99_ms']:.2f}",
+                    } for stage, stats in timings.items()
+                ],
+                use_container_width=True,
+            )
+        else:
+            st.caption("Start the stream to see per-stage timings.")
     
     # Quote of the day placeholder
     st.markdown("---")
     st.info(f"**Motivation:** {random.choice(POSITIVE_QUOTES)}")
 
+    # --- Live Metrics Polling ---
+    # Runs last, so everything above is already on the page. Reading the snapshot reference
+    # takes no lock. Streamlit only notices a button click (and ends the loop with a rerun)
+    # inside a Streamlit call, so the placeholder is redrawn on every poll, even when frames
+    # have stopped arriving and the snapshot has not changed.
+    finish_run()
+    while webrtc_ctx.state.playing:
+        tracker = webrtc_ctx.video_transformer
+        snapshot = tracker.snapshot if tracker is not None else None
+        if snapshot is None:
+            live_metrics.caption("Waiting for the first frame...")
+        else:
+            with live_metrics.container():
+                render_live_metrics(snapshot)
+        time.sleep(LIVE_METRICS_INTERVAL)
+
 elif st.session_state['show_summary']:
     # --------------------------------------------------------------------------
     # --- POST-WORKOUT SUMMARY METRICS ---
@@ -532,7 +424,8 @@ elif st.session_state['show_summary']:
     # --- Metric Calculation Logic ---
     rating = 0.0
     
-    if exercise_type in ["Push-up", "Squat"]:
+    exercise_mode = RULES.get(exercise_type, {}).get("mode")
+    if exercise_mode == "reps":
         total_reps = int(final_count)
         # Check form_ok and rep existence for accurate count
         valid_reps = sum(1 for data in rep_data if data.get('form_ok') and data.get('rep') is not None)
@@ -554,7 +447,7 @@ elif st.session_state['show_summary']:
         with col_summary_3:
             st.metric("Form Quality", f"{form_percentage:.1f}%")
         
-    elif exercise_type == "Plank":
+    elif exercise_mode == "hold":
         total_time_s = final_count
         
         # Simple rating based on time (Max 10 for 120s or more)
@@ -579,7 +472,7 @@ elif st.session_state['show_summary']:
     st.metric("Workout Rating (0-10)", f"{final_rating:.1f}")
     
     # --- Form Details (Rep-by-Rep for Repetition Exercises) ---
-    if exercise_type in ["Push-up", "Squat"] and rep_data:
+    if exercise_mode == "reps" and rep_data:
         st.markdown("---")
         st.subheader("🔍 Repetition Analysis")
         
@@ -593,8 +486,50 @@ elif st.session_state['show_summary']:
         ]
         st.dataframe(rep_data_display, use_container_width=True)
 
+    # --- Session Timeline (per-frame telemetry, downsampled for the chart) ---
+    telemetry = st.session_state.get('telemetry')
+    if telemetry is not None and len(telemetry):
+        st.markdown("---")
+        st.subheader("📈 Session Timeline")
+        timeline = downsample(telemetry, max_points=500)
+        time_axis = timeline["time"].tolist()
+        if exercise_mode == "reps":
+            angle_label = RULES[exercise_type]["angle_label"]
+            st.line_chart({
+                "Time (s)": time_axis,
+                f"{angle_label} min (deg)": timeline["angle_min"].tolist(),
+                f"{angle_label} max (deg)": timeline["angle_max"].tolist(),
+            }, x="Time (s)")
+        st.line_chart({
+            "Time (s)": time_axis,
+            "Form OK (%)": (timeline["form_ok"] * 100).tolist(),
+            "Body visibility (%)": (timeline["visibility"] * 100).tolist(),
+        }, x="Time (s)")
+
+    # --- Export ---
+    if rep_data:
+        st.markdown("---")
+        st.subheader("💾 Export Results")
+        started = time.strftime("%Y%m%d-%H%M%S", time.localtime(st.session_state['session_start_time']))
+        fmt = st.radio("Format", FORMATS, format_func=str.upper, horizontal=True, key="export_format")
+        # Only the chosen format is encoded, once per session: the summary reruns on every interaction
+        cache = st.session_state.get('export_cache')
+        if cache is None or cache['session_key'] != st.session_state['session_key']:
+            cache = st.session_state['export_cache'] = {'session_key': st.session_state['session_key']}
+        if fmt not in cache:
+            cache[fmt] = encode_rows(rep_data, fmt)
+        st.download_button(f"Download {fmt.upper()}", cache[fmt],
+                           file_name=f"{exercise_type}_{started}.{fmt}", key="export_download")
+    dropped_frames = st.session_state.get('export_dropped_frames')
+    if dropped_frames:
+        st.caption(f"The exported video skipped {dropped_frames} frames while the encoder was busy.")
+
     # --- Restart Button and Quote ---
     st.markdown("---")
     st.info(f"**Quote of the day:** {random.choice(POSITIVE_QUOTES)}")
 
-    st.button("Start New Session", on_click=new_session_callback, type="primary")
\ No newline at end of file
+    st.button("Start New Session", on_click=new_session_callback, type="primary")
+
+# The live screen records its run time before it starts polling
+if not st.session_state['is_started']:
+    finish_run()
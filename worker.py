@@ -0,0 +1,93 @@
+import threading
+import time
+
+ERROR_LOG_INTERVAL = 10.0 # Seconds between warnings while analysis keeps failing
+
+
+class LatestFrameQueue:
+    """Single-slot queue: a new frame replaces any frame that has not been picked up yet."""
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify()
+
+    def get(self):
+        """Blocks until a frame is available. Returns None once the queue is closed."""
+        with self._condition:
+            while self._item is None and not self._closed:
+                self._condition.wait()
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class InferenceWorker:
+    """
+    Runs the tracker's analysis (pose, metrics, state updates) on its own thread.
+
+    The video thread submits frames and composites the most recent result, so the
+    outgoing video never waits on inference. Frames that arrive while the worker is
+    busy replace each other; only the newest one is analysed. A frame whose analysis
+    raises is counted in `errors` and passed to `on_error`; the last result stays up.
+    """
+    def __init__(self, analyze, name="pose-inference", on_error=None):
+        self._analyze = analyze
+        self._on_error = on_error
+        self._queue = LatestFrameQueue()
+        self._result = (None, None)
+        self.errors = 0
+        self._last_error_log = float("-inf")
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self._queue.dropped
+
+    def submit(self, frame):
+        self._queue.put(frame)
+
+    def latest(self):
+        """Returns the most recent (landmarks, landmark_list) result."""
+        return self._result
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            try:
+                landmarks, landmark_list = self._analyze(frame)
+            except Exception as e:
+                # Keep serving the last result rather than killing the worker
+                self._failed(e)
+                continue
+            # Tracker buffers are reused on the next frame, so publish a copy
+            self._result = (None if landmarks is None else landmarks.copy(), landmark_list)
+
+    def _failed(self, error):
+        self.errors += 1
+        now = time.monotonic()
+        if now - self._last_error_log >= ERROR_LOG_INTERVAL:
+            self._last_error_log = now
+            print(f"Warning: {self._thread.name} could not analyse a frame ({self.errors} failed so far): {error!r}")
+        if self._on_error is not None:
+            self._on_error(error)
+
+    def stop(self, timeout=5.0):
+        """Stops the thread after the frame in progress. Returns False if it did not finish in time."""
+        self._queue.close()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()